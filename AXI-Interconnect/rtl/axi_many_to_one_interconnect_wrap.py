@@ -4,278 +4,379 @@ Wrapper Generator
 """
 
 import argparse
-from jinja2 import Template
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
 
 def main():
     parser = argparse.ArgumentParser(description=__doc__.strip())
     parser.add_argument('-s', '--s_count',  type=int, default=[6], nargs='+', help="number of slave interfaces")
     parser.add_argument('-d', '--data_width',  type=int, default=[32], nargs='+', help="width of data channel")
     parser.add_argument('-i', '--id_use', type=int, default=[1], nargs='+', help='usage of ID sognals for multi-transaction control')
+    parser.add_argument('-a', '--addr_width', type=int, default=32, help="width of address channel")
+    parser.add_argument('--id_width', type=int, default=4, help="width of ID signals")
+    parser.add_argument('--user_width', type=int, default=1, help="width of user signals")
+    parser.add_argument('-p', '--ports', type=str, default="flat", choices=PORT_MODES, help="slave interface port style")
     parser.add_argument('-n', '--name',   type=str, help="module name")
     parser.add_argument('-o', '--output', type=str, help="output file name")
+    parser.add_argument('-w', '--waves', type=str, default="off", choices=WAVES_FORMATS, help="waveform dump format")
+    parser.add_argument('--waves_scope', type=str, nargs='+', help="hierarchy to dump, relative to the wrapper (default: everything)")
+    parser.add_argument('--waves_window', action='store_true', help="start with dumping disabled, controlled by the waves_en signal")
+    parser.add_argument('-b', '--batch', action='store_true', help="generate every combination of the given parameter lists")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="number of worker processes for batch generation")
+    parser.add_argument('--output_dir', type=str, default=".", help="output directory for batch generation")
 
     args = parser.parse_args()
 
+    options = dict(
+        addr_width=args.addr_width,
+        id_width=args.id_width,
+        user_width=args.user_width,
+        ports=args.ports,
+        waves=args.waves,
+        waves_scope=args.waves_scope,
+        waves_window=args.waves_window
+    )
+
     try:
-        generate(**args.__dict__)
+        if args.batch:
+            if args.name is not None or args.output is not None:
+                parser.error("--name and --output can not be used with --batch")
+
+            print(f"Generating AXI Many to One Interconnect wrappers with {args.jobs} job(s)")
+
+            results, total = generate_batch(args.s_count, args.data_width, args.id_use, output_dir=args.output_dir, jobs=args.jobs, **options)
+
+            for output, elapsed in results:
+                print(f"  {output}: {elapsed*1000:.2f} ms")
+
+            print(f"Done. {len(results)} files in {total*1000:.2f} ms total, sum of per-file times {sum(e for _, e in results)*1000:.2f} ms")
+        else:
+            s, d, i = args.s_count[0], args.data_width[0], args.id_use[0]
+
+            print(f"Generating AXI Many to One Interconnect wrapper with S_COUNT = {s}, C_DATA_WIDTH = {d}, C_ID_MT_USE = {i}")
+
+            output = generate(s, d, i, name=args.name, output=args.output, **options)
+
+            print(f"File '{output}' written.")
     except IOError as ex:
         print(ex)
         exit(1)
 
-def generate(s_count=4, data_width=32, id_use=1, name=None, output=None):
-    s = s_count if type(s_count) == int else s_count[0]
-    d = data_width if type(data_width) == int else data_width[0]
-    i = id_use if type(id_use) == int else id_use[0]
+# AXI signal table: name, direction (as seen by the slave interfaces of the wrapper), width, channel.
+# Width is either a parameter name or a literal number of bits.
+AXI_SIGNALS = [
+    ("awid",     "input",  "C_ID_WIDTH",   "aw"),
+    ("awaddr",   "input",  "C_ADDR_WIDTH", "aw"),
+    ("awlen",    "input",  8,              "aw"),
+    ("awsize",   "input",  3,              "aw"),
+    ("awburst",  "input",  2,              "aw"),
+    ("awlock",   "input",  1,              "aw"),
+    ("awcache",  "input",  4,              "aw"),
+    ("awprot",   "input",  3,              "aw"),
+    ("awqos",    "input",  4,              "aw"),
+    ("awregion", "input",  4,              "aw"),
+    ("awuser",   "input",  "C_USER_WIDTH", "aw"),
+    ("awvalid",  "input",  1,              "aw"),
+    ("awready",  "output", 1,              "aw"),
+    ("wdata",    "input",  "C_DATA_WIDTH", "w"),
+    ("wstrb",    "input",  "C_STRB_WIDTH", "w"),
+    ("wlast",    "input",  1,              "w"),
+    ("wuser",    "input",  "C_USER_WIDTH", "w"),
+    ("wvalid",   "input",  1,              "w"),
+    ("wready",   "output", 1,              "w"),
+    ("bid",      "output", "C_ID_WIDTH",   "b"),
+    ("bresp",    "output", 2,              "b"),
+    ("buser",    "output", "C_USER_WIDTH", "b"),
+    ("bvalid",   "output", 1,              "b"),
+    ("bready",   "input",  1,              "b"),
+    ("arid",     "input",  "C_ID_WIDTH",   "ar"),
+    ("araddr",   "input",  "C_ADDR_WIDTH", "ar"),
+    ("arlen",    "input",  8,              "ar"),
+    ("arsize",   "input",  3,              "ar"),
+    ("arburst",  "input",  2,              "ar"),
+    ("arlock",   "input",  1,              "ar"),
+    ("arcache",  "input",  4,              "ar"),
+    ("arprot",   "input",  3,              "ar"),
+    ("arqos",    "input",  4,              "ar"),
+    ("arregion", "input",  4,              "ar"),
+    ("aruser",   "input",  "C_USER_WIDTH", "ar"),
+    ("arvalid",  "input",  1,              "ar"),
+    ("arready",  "output", 1,              "ar"),
+    ("rid",      "output", "C_ID_WIDTH",   "r"),
+    ("rdata",    "output", "C_DATA_WIDTH", "r"),
+    ("rresp",    "output", 2,              "r"),
+    ("rlast",    "output", 1,              "r"),
+    ("ruser",    "output", "C_USER_WIDTH", "r"),
+    ("rvalid",   "output", 1,              "r"),
+    ("rready",   "input",  1,              "r"),
+]
 
-    if name is None:
-        name = f"axi_many_to_one_interconnect_wrap_{s}_{d}_{i}"
+# slave interface port styles: one set of ports per interface, or one unpacked array port per signal
+PORT_MODES = ("flat", "array")
 
-    if output is None:
-        output = name + ".sv"
+# waveform dump formats, "off" emits no dump code at all
+WAVES_FORMATS = ("off", "vcd", "fst")
 
-    print(f"Generating AXI Many to One Interconnect wrapper {name} with S_COUNT = {s}, C_DATA_WIDTH = {d}, C_ID_MT_USE = {i}")
+# signals present on the master interface only
+M_ONLY_SIGNALS = ("awregion", "arregion")
 
-    t = Template(u"""
+TEMPLATE = u"""
 `resetall
 `timescale 1ns / 1ps
 
 /*
- * AXI Many to One Interconnect wrapper with S_COUNT = {{s}}, C_DATA_WIDTH = {{d}}, C_ID_MT_USE = {{i}}
+ * AXI Many to One Interconnect wrapper with S_COUNT = {{s}}, C_DATA_WIDTH = {{d}}, C_ID_MT_USE = {{i}},
+ * C_ADDR_WIDTH = {{addr_width}}, C_ID_WIDTH = {{id_width}}, C_USER_WIDTH = {{user_width}}
  */
 
- module {{name}} # (
+module {{name}} # (
     parameter C_S_COUNT = {{s}},
-	parameter C_ADDR_WIDTH = 32,
-	parameter C_DATA_WIDTH = {{d}},
-	parameter C_STRB_WIDTH = C_DATA_WIDTH / 8,
-	parameter C_ID_WIDTH = 4,
-	parameter C_USER_WIDTH = 1,
-	parameter C_ID_MT_USE = {{i}}
+    parameter C_ADDR_WIDTH = {{addr_width}},
+    parameter C_DATA_WIDTH = {{d}},
+    parameter C_STRB_WIDTH = C_DATA_WIDTH / 8,
+    parameter C_ID_WIDTH = {{id_width}},
+    parameter C_USER_WIDTH = {{user_width}},
+    parameter C_ID_MT_USE = {{i}}
 )
 (
     // Clock and Resetn
-	input logic clk,
-	input logic resetn,
-
-	/*
-		Slave Interfaces
-	*/
-	{%- for p in range(s) %}
-	input  logic [C_ID_WIDTH-1:0]   s{{'%02d'%p}}_axi_awid,
-    input  logic [C_ADDR_WIDTH-1:0] s{{'%02d'%p}}_axi_awaddr,
-    input  logic [7:0]              s{{'%02d'%p}}_axi_awlen,
-    input  logic [2:0]              s{{'%02d'%p}}_axi_awsize,
-    input  logic [1:0]              s{{'%02d'%p}}_axi_awburst,
-    input  logic                    s{{'%02d'%p}}_axi_awlock,
-    input  logic [3:0]              s{{'%02d'%p}}_axi_awcache,
-    input  logic [2:0]              s{{'%02d'%p}}_axi_awprot,
-    input  logic [3:0]              s{{'%02d'%p}}_axi_awqos,
-    input  logic [C_USER_WIDTH-1:0] s{{'%02d'%p}}_axi_awuser,
-    input  logic                    s{{'%02d'%p}}_axi_awvalid,
-    output logic                    s{{'%02d'%p}}_axi_awready,
-    input  logic [C_DATA_WIDTH-1:0] s{{'%02d'%p}}_axi_wdata,
-    input  logic [C_STRB_WIDTH-1:0] s{{'%02d'%p}}_axi_wstrb,
-    input  logic                    s{{'%02d'%p}}_axi_wlast,
-    input  logic [C_USER_WIDTH-1:0] s{{'%02d'%p}}_axi_wuser,
-    input  logic                    s{{'%02d'%p}}_axi_wvalid,
-    output logic                    s{{'%02d'%p}}_axi_wready,
-    output logic [C_ID_WIDTH-1:0]   s{{'%02d'%p}}_axi_bid,
-    output logic [1:0]              s{{'%02d'%p}}_axi_bresp,
-    output logic [C_USER_WIDTH-1:0] s{{'%02d'%p}}_axi_buser,
-    output logic                    s{{'%02d'%p}}_axi_bvalid,
-    input  logic                    s{{'%02d'%p}}_axi_bready,
-    input  logic [C_ID_WIDTH-1:0]   s{{'%02d'%p}}_axi_arid,
-    input  logic [C_ADDR_WIDTH-1:0] s{{'%02d'%p}}_axi_araddr,
-    input  logic [7:0]              s{{'%02d'%p}}_axi_arlen,
-    input  logic [2:0]              s{{'%02d'%p}}_axi_arsize,
-    input  logic [1:0]              s{{'%02d'%p}}_axi_arburst,
-    input  logic                    s{{'%02d'%p}}_axi_arlock,
-    input  logic [3:0]              s{{'%02d'%p}}_axi_arcache,
-    input  logic [2:0]              s{{'%02d'%p}}_axi_arprot,
-    input  logic [3:0]              s{{'%02d'%p}}_axi_arqos,
-    input  logic [C_USER_WIDTH-1:0] s{{'%02d'%p}}_axi_aruser,
-    input  logic                    s{{'%02d'%p}}_axi_arvalid,
-    output logic                    s{{'%02d'%p}}_axi_arready,
-    output logic [C_ID_WIDTH-1:0]   s{{'%02d'%p}}_axi_rid,
-    output logic [C_DATA_WIDTH-1:0] s{{'%02d'%p}}_axi_rdata,
-    output logic [1:0]              s{{'%02d'%p}}_axi_rresp,
-    output logic                    s{{'%02d'%p}}_axi_rlast,
-    output logic [C_USER_WIDTH-1:0] s{{'%02d'%p}}_axi_ruser,
-    output logic                    s{{'%02d'%p}}_axi_rvalid,
-    input  logic                    s{{'%02d'%p}}_axi_rready,
-    {% endfor %}
+    input logic clk,
+    input logic resetn,
 
     /*
-		Master Interface
-	*/
-	output logic [C_ID_WIDTH-1:0]   m_axi_awid,
-    output logic [C_ADDR_WIDTH-1:0] m_axi_awaddr,
-    output logic [7:0]              m_axi_awlen,
-    output logic [2:0]              m_axi_awsize,
-    output logic [1:0]              m_axi_awburst,
-    output logic                    m_axi_awlock,
-    output logic [3:0]              m_axi_awcache,
-    output logic [2:0]              m_axi_awprot,
-    output logic [3:0]              m_axi_awqos,
-    output logic [3:0]              m_axi_awregion,
-    output logic [C_USER_WIDTH-1:0] m_axi_awuser,
-    output logic                    m_axi_awvalid,
-    input  logic                    m_axi_awready,
-    output logic [C_DATA_WIDTH-1:0] m_axi_wdata,
-    output logic [C_STRB_WIDTH-1:0] m_axi_wstrb,
-    output logic                    m_axi_wlast,
-    output logic [C_USER_WIDTH-1:0] m_axi_wuser,
-    output logic                    m_axi_wvalid,
-    input  logic                    m_axi_wready,
-    input  logic [C_ID_WIDTH-1:0]   m_axi_bid,
-    input  logic [1:0]              m_axi_bresp,
-    input  logic [C_USER_WIDTH-1:0] m_axi_buser,
-    input  logic                    m_axi_bvalid,
-    output logic                    m_axi_bready,
-    output logic [C_ID_WIDTH-1:0]   m_axi_arid,
-    output logic [C_ADDR_WIDTH-1:0] m_axi_araddr,
-    output logic [7:0]              m_axi_arlen,
-    output logic [2:0]              m_axi_arsize,
-    output logic [1:0]              m_axi_arburst,
-    output logic                    m_axi_arlock,
-    output logic [3:0]              m_axi_arcache,
-    output logic [2:0]              m_axi_arprot,
-    output logic [3:0]              m_axi_arqos,
-    output logic [3:0]              m_axi_arregion,
-    output logic [C_USER_WIDTH-1:0] m_axi_aruser,
-    output logic                    m_axi_arvalid,
-    input  logic                    m_axi_arready,
-    input  logic [C_ID_WIDTH-1:0]   m_axi_rid,
-    input  logic [C_DATA_WIDTH-1:0] m_axi_rdata,
-    input  logic [1:0]              m_axi_rresp,
-    input  logic                    m_axi_rlast,
-    input  logic [C_USER_WIDTH-1:0] m_axi_ruser,
-    input  logic                    m_axi_rvalid,
-    output logic                    m_axi_rready
+        Slave Interfaces
+    */
+{{ports}}
 );
 
+{{packing}}
 axi_many_to_one_interconnect # (
     .C_S_COUNT(C_S_COUNT),
-	.C_ADDR_WIDTH(C_ADDR_WIDTH),
-	.C_DATA_WIDTH(C_DATA_WIDTH),
-	.C_STRB_WIDTH(C_STRB_WIDTH),
-	.C_ID_WIDTH(C_ID_WIDTH),
-	.C_USER_WIDTH(C_USER_WIDTH),
-	.C_ID_MT_USE(C_ID_MT_USE)
+    .C_ADDR_WIDTH(C_ADDR_WIDTH),
+    .C_DATA_WIDTH(C_DATA_WIDTH),
+    .C_STRB_WIDTH(C_STRB_WIDTH),
+    .C_ID_WIDTH(C_ID_WIDTH),
+    .C_USER_WIDTH(C_USER_WIDTH),
+    .C_ID_MT_USE(C_ID_MT_USE)
 ) axi_many_to_one_interconnect_inst (
     .clk(clk),
     .resetn(resetn),
-    .s_axi_awid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awaddr({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awaddr{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awlen({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awlen{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awsize({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awsize{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awburst({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awburst{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awlock({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awlock{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awcache({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awcache{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awprot({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awprot{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awqos({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awqos{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awuser({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awuser{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awvalid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awvalid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_awready({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_awready{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_wdata({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_wdata{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_wstrb({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_wstrb{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_wlast({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_wlast{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_wuser({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_wuser{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_wvalid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_wvalid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_wready({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_wready{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_bid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_bid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_bresp({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_bresp{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_buser({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_buser{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_bvalid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_bvalid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_bready({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_bready{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_araddr({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_araddr{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arlen({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arlen{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arsize({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arsize{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arburst({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arburst{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arlock({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arlock{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arcache({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arcache{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arprot({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arprot{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arqos({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arqos{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_aruser({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_aruser{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arvalid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arvalid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_arready({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_arready{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_rid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_rid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_rdata({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_rdata{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_rresp({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_rresp{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_rlast({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_rlast{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_ruser({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_ruser{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_rvalid({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_rvalid{% if not loop.last %}, {% endif %}{% endfor %} }),
-    .s_axi_rready({ {% for p in range(s-1,-1,-1) %}s{{'%02d'%p}}_axi_rready{% if not loop.last %}, {% endif %}{% endfor %} }),
-	.m_axi_awid(m_axi_awid),
-    .m_axi_awaddr(m_axi_awaddr),
-    .m_axi_awlen(m_axi_awlen),
-    .m_axi_awsize(m_axi_awsize),
-    .m_axi_awburst(m_axi_awburst),
-    .m_axi_awlock(m_axi_awlock),
-    .m_axi_awcache(m_axi_awcache),
-    .m_axi_awprot(m_axi_awprot),
-    .m_axi_awqos(m_axi_awqos),
-    .m_axi_awregion(m_axi_awregion),
-    .m_axi_awuser(m_axi_awuser),
-    .m_axi_awvalid(m_axi_awvalid),
-    .m_axi_awready(m_axi_awready),
-    .m_axi_wdata(m_axi_wdata),
-    .m_axi_wstrb(m_axi_wstrb),
-    .m_axi_wlast(m_axi_wlast),
-    .m_axi_wuser(m_axi_wuser),
-    .m_axi_wvalid(m_axi_wvalid),
-    .m_axi_wready(m_axi_wready),
-    .m_axi_bid(m_axi_bid),
-    .m_axi_bresp(m_axi_bresp),
-    .m_axi_buser(m_axi_buser),
-    .m_axi_bvalid(m_axi_bvalid),
-    .m_axi_bready(m_axi_bready),
-    .m_axi_arid(m_axi_arid),
-    .m_axi_araddr(m_axi_araddr),
-    .m_axi_arlen(m_axi_arlen),
-    .m_axi_arsize(m_axi_arsize),
-    .m_axi_arburst(m_axi_arburst),
-    .m_axi_arlock(m_axi_arlock),
-    .m_axi_arcache(m_axi_arcache),
-    .m_axi_arprot(m_axi_arprot),
-    .m_axi_arqos(m_axi_arqos),
-    .m_axi_arregion(m_axi_arregion),
-    .m_axi_aruser(m_axi_aruser),
-    .m_axi_arvalid(m_axi_arvalid),
-    .m_axi_arready(m_axi_arready),
-    .m_axi_rid(m_axi_rid),
-    .m_axi_rdata(m_axi_rdata),
-    .m_axi_rresp(m_axi_rresp),
-    .m_axi_rlast(m_axi_rlast),
-    .m_axi_ruser(m_axi_ruser),
-    .m_axi_rvalid(m_axi_rvalid),
-    .m_axi_rready(m_axi_rready)
+{{connections}}
 );
 
+{%- if waves != "off" %}
+
+// Waveform capture
+{%- if waves_window %}
+// dumping starts disabled, the testbench drives waves_en to record a time window
+logic waves_en = 1'b0;
+{%- endif %}
+
 initial begin
-    $dumpfile("waves.vcd");
-    $dumpvars;
+    $dumpfile("waves.{{waves}}");
+{%- for scope in waves_scope %}
+    $dumpvars(0, {{scope}});
+{%- endfor %}
+{%- if waves_window %}
+    $dumpoff;
+{%- endif %}
+end
+{%- if waves_window %}
+
+always @(waves_en) begin
+    if (waves_en)
+        $dumpon;
+    else
+        $dumpoff;
 end
+{%- endif %}
+{%- endif %}
 
 endmodule
 
 `resetall
 
-""")
+"""
+
+# Compiled template bytecode is kept on disk, keyed by the template source checksum
+CACHE_DIR = os.environ.get("AXI_WRAP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "axi_wrap_jinja_cache"))
+
+# Template is compiled once per process and shared by every render call
+_template = None
+
+def get_template():
+    global _template
+
+    if _template is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        env = Environment(loader=DictLoader({"wrapper": TEMPLATE}), bytecode_cache=FileSystemBytecodeCache(CACHE_DIR))
+        _template = env.get_template("wrapper")
+
+    return _template
+
+def port_range(width):
+    if width == 1:
+        return ""
+    if type(width) == int:
+        return f"[{width-1}:0]"
+    return f"[{width}-1:0]"
+
+def port_declaration(direction, width, port, array=False):
+    # array ports are unpacked arrays with one element per slave interface
+    if array:
+        port += " [C_S_COUNT]"
+    return f"    {direction:<6} logic {port_range(width):<18} {port}"
+
+def build_ports(s, mode="flat"):
+    """
+    Port declarations, packing logic and instance connections, built in a single pass over the signal table.
+    In "flat" mode every slave interface gets its own sNN_axi_* ports, which are concatenated for the interconnect.
+    In "array" mode every signal is a single s_axi_* unpacked array port indexed by slave interface,
+    so the wrapper size does not depend on S_COUNT.
+    """
+    s_ports = [[] for p in range(s)] if mode == "flat" else [[]]
+    m_ports = []
+    packing = []
+    s_connections = []
+    m_connections = []
+
+    for name, direction, width, channel in AXI_SIGNALS:
+        # master interface directions are inverted with respect to the slave interfaces
+        m_direction = "output" if direction == "input" else "input"
+        m_ports.append(port_declaration(m_direction, width, f"m_axi_{name}"))
+        m_connections.append(f"    .m_axi_{name}(m_axi_{name})")
+
+        if name in M_ONLY_SIGNALS:
+            continue
+
+        if mode == "flat":
+            for p in range(s):
+                s_ports[p].append(port_declaration(direction, width, f"s{p:02d}_axi_{name}"))
+
+            concat = ", ".join(f"s{p:02d}_axi_{name}" for p in range(s-1, -1, -1))
+            s_connections.append(f"    .s_axi_{name}({{ {concat} }})")
+        else:
+            s_ports[0].append(port_declaration(direction, width, f"s_axi_{name}", array=True))
+
+            packing.append((name, direction, width))
+            s_connections.append(f"    .s_axi_{name}(s_axi_{name}_flat)")
 
-    print(f"Writing file '{output}'...")
+    ports = ",\n".join(itertools.chain.from_iterable(s_ports))
+    ports += ",\n\n    /*\n        Master Interface\n    */\n"
+    ports += ",\n".join(m_ports)
+
+    return ports, build_packing(packing), ",\n".join(s_connections + m_connections)
+
+def build_packing(signals):
+    if not signals:
+        return ""
+
+    lines = ["// Slave interface arrays packed into the flat vectors of the interconnect"]
+    for name, direction, width in signals:
+        lines.append(f"logic [C_S_COUNT*{width}-1:0] s_axi_{name}_flat;")
+
+    lines.append("")
+    lines.append("for (genvar p = 0; p < C_S_COUNT; p = p + 1) begin : g_pack")
+    for name, direction, width in signals:
+        if direction == "input":
+            lines.append(f"    assign s_axi_{name}_flat[p*{width} +: {width}] = s_axi_{name}[p];")
+        else:
+            lines.append(f"    assign s_axi_{name}[p] = s_axi_{name}_flat[p*{width} +: {width}];")
+    lines.append("end")
+
+    return "\n".join(lines) + "\n"
+
+def default_name(s, d, i):
+    return f"axi_many_to_one_interconnect_wrap_{s}_{d}_{i}"
+
+def render(s_count=4, data_width=32, id_use=1, addr_width=32, id_width=4, user_width=1, name=None,
+           ports="flat", waves="off", waves_scope=None, waves_window=False, stream=None):
+    """
+    Render a wrapper. Returns the source as a string or, if stream is given,
+    writes it to that file-like object chunk by chunk and returns None.
+    """
+    if name is None:
+        name = default_name(s_count, data_width, id_use)
+
+    if ports not in PORT_MODES:
+        raise ValueError(f"Unknown port mode '{ports}', expected one of {PORT_MODES}")
+
+    if waves not in WAVES_FORMATS:
+        raise ValueError(f"Unknown waveform format '{waves}', expected one of {WAVES_FORMATS}")
+
+    # scopes are hierarchical paths relative to the wrapper, e.g. axi_many_to_one_interconnect_inst
+    if not waves_scope:
+        waves_scope = [name]
+
+    port_list, packing, connections = build_ports(s_count, ports)
+
+    context = dict(
+        s=s_count,
+        d=data_width,
+        i=id_use,
+        addr_width=addr_width,
+        id_width=id_width,
+        user_width=user_width,
+        name=name,
+        ports=port_list,
+        packing=packing,
+        connections=connections,
+        waves=waves,
+        waves_scope=waves_scope,
+        waves_window=waves_window
+    )
+
+    if stream is None:
+        return get_template().render(**context)
+
+    get_template().stream(**context).dump(stream)
+
+def generate(s_count=4, data_width=32, id_use=1, name=None, output=None, **options):
+    """Write a wrapper to output (default: <name>.sv) and return the file name."""
+    if name is None:
+        name = default_name(s_count, data_width, id_use)
+
+    if output is None:
+        output = name + ".sv"
 
     with open(output, 'w') as f:
-        f.write(t.render(
-            s=s,
-            d=d,
-            i=i,
-            name=name
-        ))
-        f.flush()
-
-    print("Done.")
+        render(s_count, data_width, id_use, name=name, stream=f, **options)
+
+    return output
+
+def _generate_one(params):
+    s, d, i, output_dir, options = params
+
+    start = time.perf_counter()
+    output = generate(s, d, i, output=os.path.join(output_dir, default_name(s, d, i) + ".sv"), **options)
+    elapsed = time.perf_counter() - start
+
+    return output, elapsed
+
+def generate_batch(s_count=(4,), data_width=(32,), id_use=(1,), output_dir=".", jobs=1, **options):
+    """
+    Generate every combination of the parameter lists. Returns a list of (file name, seconds) pairs
+    and the total wall time.
+    """
+    configs = [(s, d, i, output_dir, options) for s, d, i in itertools.product(s_count, data_width, id_use)]
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # template is compiled up front (once per worker) so per-file timings are render + write only
+    start = time.perf_counter()
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=get_template) as pool:
+            results = list(pool.map(_generate_one, configs))
+    else:
+        get_template()
+        results = [_generate_one(c) for c in configs]
+    total = time.perf_counter() - start
+
+    return results, total
 
 if __name__ == "__main__":
     main()
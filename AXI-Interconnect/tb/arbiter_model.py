@@ -0,0 +1,131 @@
+"""
+Cycle-accurate NumPy model of arbiter.sv
+"""
+
+import numpy as np
+
+MAX_PORTS = 64
+
+
+def msb_index(x):
+    """Index of the most significant set bit of every element of a uint64 array, 0 for 0."""
+    x = x.copy()
+    idx = np.zeros(x.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        m = x >= (np.uint64(1) << np.uint64(s))
+        idx += m * s
+        x = np.where(m, x >> np.uint64(s), x)
+    return idx
+
+
+class ArbiterModel(object):
+    """
+    Registered state and next state logic of arbiter.sv. step() takes the request and acknowledge
+    inputs sampled on one rising clock edge for any number of independent arbiters (lanes) and returns
+    grant, grant_valid and grant_encoded after that edge. run() applies step() to whole sequences.
+    """
+    def __init__(self, ports, round_robin=0, block=0, block_ack=1, lsb_priority=0):
+        if not 1 <= ports <= MAX_PORTS:
+            raise ValueError(f"ports must be between 1 and {MAX_PORTS}")
+
+        self.ports = ports
+        self.round_robin = bool(round_robin)
+        self.block = bool(block)
+        self.block_ack = bool(block_ack)
+        self.lsb_priority = bool(lsb_priority)
+
+        full = (1 << ports) - 1
+        self.full = np.uint64(full)
+        self.onehot = np.array([1 << k for k in range(ports)], dtype=np.uint64)
+
+        # round robin mask after granting port k: the ports of lower priority than k
+        if self.lsb_priority:
+            self.rr_mask = np.array([(full << (k + 1)) & full for k in range(ports)], dtype=np.uint64)
+        else:
+            self.rr_mask = np.array([(1 << k) - 1 for k in range(ports)], dtype=np.uint64)
+
+        self.reset()
+
+    def reset(self, lanes=None):
+        shape = () if lanes is None else (lanes,)
+        self.grant = np.zeros(shape, dtype=np.uint64)
+        self.grant_valid = np.zeros(shape, dtype=bool)
+        self.grant_encoded = np.zeros(shape, dtype=np.int64)
+        self.mask = np.zeros(shape, dtype=np.uint64)
+
+    def encode(self, x):
+        # priority_encoder.sv, valid only for nonzero inputs
+        if self.lsb_priority:
+            # lowest set bit, two's complement wraps around for 0
+            with np.errstate(over='ignore'):
+                x = x & (~x + np.uint64(1))
+        return msb_index(x)
+
+    def step(self, request, acknowledge=0):
+        request = np.asarray(request, dtype=np.uint64) & self.full
+        acknowledge = np.asarray(acknowledge, dtype=np.uint64) & self.full
+
+        request_valid = request != 0
+
+        if self.round_robin:
+            masked = request & self.mask
+            index = self.encode(np.where(masked != 0, masked, request))
+            mask_next = np.where(request_valid, self.rr_mask[index], np.uint64(0))
+        else:
+            index = self.encode(request)
+            mask_next = np.zeros(request.shape, dtype=np.uint64)
+
+        grant_next = np.where(request_valid, self.onehot[index], np.uint64(0))
+        encoded_next = np.where(request_valid, index, 0)
+
+        if self.block and not self.block_ack:
+            hold = (self.grant & request) != 0
+        elif self.block:
+            hold = self.grant_valid & ((self.grant & acknowledge) == 0)
+        else:
+            hold = None
+
+        if hold is not None:
+            # held grants keep their registers, the round robin mask is cleared as in the RTL
+            grant_next = np.where(hold, self.grant, grant_next)
+            request_valid = np.where(hold, self.grant_valid, request_valid)
+            encoded_next = np.where(hold, self.grant_encoded, encoded_next)
+            mask_next = np.where(hold, np.uint64(0), mask_next)
+
+        self.grant = grant_next
+        self.grant_valid = request_valid
+        self.grant_encoded = encoded_next
+        self.mask = mask_next
+
+        return self.grant, self.grant_valid, self.grant_encoded
+
+    def run(self, request, acknowledge=None):
+        """
+        Outputs after every clock edge for request/acknowledge sequences of shape (cycles,) or
+        (cycles, lanes), starting from reset.
+        """
+        request = np.asarray(request, dtype=np.uint64)
+        if acknowledge is None:
+            acknowledge = np.zeros(request.shape, dtype=np.uint64)
+        acknowledge = np.asarray(acknowledge, dtype=np.uint64)
+
+        self.reset(request.shape[1] if request.ndim > 1 else None)
+
+        grant = np.zeros(request.shape, dtype=np.uint64)
+        grant_valid = np.zeros(request.shape, dtype=bool)
+        grant_encoded = np.zeros(request.shape, dtype=np.int64)
+
+        if not self.round_robin and not self.block:
+            # no state besides the output registers, every cycle is independent
+            request = request & self.full
+            grant_valid[:] = request != 0
+            grant_encoded[:] = np.where(grant_valid, self.encode(request), 0)
+            grant[:] = np.where(grant_valid, self.onehot[grant_encoded], np.uint64(0))
+            if len(request):
+                self.grant, self.grant_valid, self.grant_encoded = grant[-1], grant_valid[-1], grant_encoded[-1]
+            return grant, grant_valid, grant_encoded
+
+        for t in range(request.shape[0]):
+            grant[t], grant_valid[t], grant_encoded[t] = self.step(request[t], acknowledge[t])
+
+        return grant, grant_valid, grant_encoded
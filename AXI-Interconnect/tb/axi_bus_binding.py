@@ -0,0 +1,50 @@
+"""
+AXI bus binding helpers for the interconnect wrappers
+"""
+
+from cocotbext.axi import AxiBus
+from cocotbext.axi.axi_channels import AxiAWBus, AxiWBus, AxiBBus, AxiARBus, AxiRBus
+
+AXI_SIGNALS = [sig for bus in (AxiAWBus, AxiWBus, AxiBBus, AxiARBus, AxiRBus) for sig in bus._signals + bus._optional_signals]
+
+
+class BusEntity(object):
+    """
+    Stand-in for a simulator handle holding only the signals of one bus.
+    cocotb_bus matches every signal case-insensitively by scanning dir() of the entity,
+    which on the wrapper itself means scanning every port of every interface.
+    """
+    def __init__(self, entity, name, handles):
+        self._name = name
+        self._log = entity._log
+        self.__dict__.update(handles)
+
+
+def axi_bus(dut, prefix, handles=None):
+    """AxiBus for the <prefix>_* ports of dut, looking up every signal by its exact name once."""
+    if handles is None:
+        handles = {f"{prefix}_{sig}": getattr(dut, f"{prefix}_{sig}") for sig in AXI_SIGNALS if hasattr(dut, f"{prefix}_{sig}")}
+
+    return AxiBus.from_prefix(BusEntity(dut, f"{dut._name}.{prefix}", handles), prefix)
+
+
+def axi_slave_buses(dut, count):
+    """
+    One AxiBus per slave interface of a wrapper, for both port styles of the generator.
+    With "array" ports every s_axi_* array is looked up once and indexed per interface.
+    With "flat" ports the sNN_axi_* signals present on interface 0 are looked up by exact name.
+    """
+    if hasattr(dut, "s_axi_awvalid"):
+        arrays = {sig: getattr(dut, f"s_axi_{sig}") for sig in AXI_SIGNALS if hasattr(dut, f"s_axi_{sig}")}
+
+        return [
+            AxiBus.from_prefix(BusEntity(dut, f"{dut._name}.s_axi[{k}]", {f"s_axi_{sig}": a[k] for sig, a in arrays.items()}), "s_axi")
+            for k in range(count)
+        ]
+
+    signals = [sig for sig in AXI_SIGNALS if hasattr(dut, f"s00_axi_{sig}")]
+
+    return [
+        axi_bus(dut, f"s{k:02d}_axi", {f"s{k:02d}_axi_{sig}": getattr(dut, f"s{k:02d}_axi_{sig}") for sig in signals})
+        for k in range(count)
+    ]
@@ -0,0 +1,157 @@
+"""
+Bandwidth and latency measurement on the interconnect ports
+"""
+
+from collections import Counter, deque
+
+import cocotb
+from cocotb.triggers import RisingEdge, ReadOnly
+
+
+def histogram_stats(hist):
+    count = sum(hist.values())
+    if not count:
+        return dict(count=0)
+
+    values = sorted(hist.items())
+
+    def percentile(p):
+        target = p * count / 100
+        acc = 0
+        for value, n in values:
+            acc += n
+            if acc >= target:
+                return value
+        return values[-1][0]
+
+    return dict(
+        count=count,
+        min=values[0][0],
+        max=values[-1][0],
+        mean=sum(v*n for v, n in values) / count,
+        p50=percentile(50),
+        p90=percentile(90),
+        p99=percentile(99),
+        histogram={str(v): n for v, n in values}
+    )
+
+
+class ChannelLatency(object):
+    """Cycles from AxVALID assertion to the AxVALID & AxREADY handshake, i.e. request to grant."""
+    def __init__(self):
+        self.start = None
+        self.hist = Counter()
+
+    def sample(self, cycle, valid, ready):
+        if valid and self.start is None:
+            self.start = cycle
+        if valid and ready:
+            self.hist[cycle - self.start] += 1
+            self.start = None
+
+
+class AxiPerfMonitor(object):
+    """
+    Samples the handshakes of the m_axi bus and of every slave interface bus once per clock cycle.
+    Records bytes transferred on m_axi and per slave interface, request to grant latency of AW/AR
+    and address to last beat latency (AW to WLAST, AR to RLAST) per slave interface. Write data may
+    come before its address: a WLAST without an outstanding AW waits for the next AW, and counts
+    negative, the cycles the data led the address by.
+    """
+    def __init__(self, clock, m_bus, s_buses):
+        self.clock = clock
+        self.m_bus = m_bus
+        self.s_buses = s_buses
+
+        self.cycles = 0
+        self.m_bytes = 0
+        self.s_bytes = [0] * len(s_buses)
+
+        self.aw_grant = [ChannelLatency() for bus in s_buses]
+        self.ar_grant = [ChannelLatency() for bus in s_buses]
+
+        # handshake cycle of outstanding addresses, waiting for their last beat
+        self.aw_pending = [deque() for bus in s_buses]
+        self.ar_pending = [deque() for bus in s_buses]
+        # handshake cycle of last beats that came before their address
+        self.wlast_pending = [deque() for bus in s_buses]
+        self.write_latency = [Counter() for bus in s_buses]
+        self.read_latency = [Counter() for bus in s_buses]
+
+        self._cr = None
+
+    def start(self):
+        if self._cr is None:
+            self._cr = cocotb.start_soon(self._run())
+
+    def stop(self):
+        if self._cr is not None:
+            self._cr.kill()
+            self._cr = None
+
+    @staticmethod
+    def _beat_bytes(strb):
+        return strb.value.binstr.count('1')
+
+    async def _run(self):
+        m = self.m_bus
+        r_bytes = len(m.read.r.rdata) // 8
+
+        while True:
+            await RisingEdge(self.clock)
+            await ReadOnly()
+            cycle = self.cycles
+            self.cycles += 1
+
+            if m.write.w.wvalid.value and m.write.w.wready.value:
+                self.m_bytes += self._beat_bytes(m.write.w.wstrb)
+            if m.read.r.rvalid.value and m.read.r.rready.value:
+                self.m_bytes += r_bytes
+
+            for k, s in enumerate(self.s_buses):
+                awvalid, awready = s.write.aw.awvalid.value, s.write.aw.awready.value
+                arvalid, arready = s.read.ar.arvalid.value, s.read.ar.arready.value
+
+                self.aw_grant[k].sample(cycle, awvalid, awready)
+                self.ar_grant[k].sample(cycle, arvalid, arready)
+
+                if awvalid and awready:
+                    if self.wlast_pending[k]:
+                        self.write_latency[k][self.wlast_pending[k].popleft() - cycle] += 1
+                    else:
+                        self.aw_pending[k].append(cycle)
+                if arvalid and arready:
+                    self.ar_pending[k].append(cycle)
+
+                if s.write.w.wvalid.value and s.write.w.wready.value:
+                    self.s_bytes[k] += self._beat_bytes(s.write.w.wstrb)
+                    if s.write.w.wlast.value:
+                        if self.aw_pending[k]:
+                            self.write_latency[k][cycle - self.aw_pending[k].popleft()] += 1
+                        else:
+                            self.wlast_pending[k].append(cycle)
+
+                if s.read.r.rvalid.value and s.read.r.rready.value:
+                    self.s_bytes[k] += r_bytes
+                    if s.read.r.rlast.value and self.ar_pending[k]:
+                        self.read_latency[k][cycle - self.ar_pending[k].popleft()] += 1
+
+    def report(self):
+        cycles = max(self.cycles, 1)
+
+        return dict(
+            cycles=self.cycles,
+            bytes=self.m_bytes,
+            bytes_per_cycle=self.m_bytes / cycles,
+            masters=[
+                dict(
+                    bytes=self.s_bytes[k],
+                    bytes_per_cycle=self.s_bytes[k] / cycles,
+                    aw_grant_latency=histogram_stats(self.aw_grant[k].hist),
+                    ar_grant_latency=histogram_stats(self.ar_grant[k].hist),
+                    write_latency=histogram_stats(self.write_latency[k]),
+                    read_latency=histogram_stats(self.read_latency[k])
+                )
+                for k in range(len(self.s_buses))
+            ]
+        )
@@ -0,0 +1,269 @@
+"""
+Passive AXI port monitor and transaction scoreboard for the interconnect
+"""
+
+from collections import deque, defaultdict
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.utils import get_sim_time
+
+
+class AxiAddr(object):
+    __slots__ = ("time", "id", "addr", "len", "size", "burst", "qos")
+
+    def __init__(self, time, id, addr, len, size, burst, qos=0):
+        self.time = time
+        self.id = id
+        self.addr = addr
+        self.len = len
+        self.size = size
+        self.burst = burst
+        self.qos = qos
+
+    def fields(self):
+        return (self.id, self.addr, self.len, self.size, self.burst, self.qos)
+
+    def __repr__(self):
+        return f"AxiAddr(time={self.time}, id={self.id}, addr={self.addr:#x}, len={self.len}, size={self.size}, burst={self.burst}, qos={self.qos})"
+
+
+class AxiBeat(object):
+    """W beat (data, strb, last) or B/R response (id, data, resp, last); B responses have data 0 and last 1."""
+    __slots__ = ("time", "id", "data", "extra", "last")
+
+    def __init__(self, time, id, data, extra, last):
+        self.time = time
+        self.id = id
+        self.data = data
+        self.extra = extra
+        self.last = last
+
+    def fields(self):
+        return (self.id, self.data, self.extra, self.last)
+
+    def __repr__(self):
+        return f"AxiBeat(time={self.time}, id={self.id}, data={self.data:#x}, extra={self.extra:#x}, last={self.last})"
+
+
+def _int(sig):
+    return int(sig.value) if sig is not None else 0
+
+
+class AxiPortMonitor(object):
+    """
+    Passive monitor of one AXI port. Every channel given a callback gets a coroutine that samples its
+    handshake on each rising clock edge while VALID is high and sleeps until VALID rises otherwise.
+    The payload is only read on a handshake, and passed to the callback as an AxiAddr or AxiBeat.
+    """
+    def __init__(self, bus, clock, aw=None, w=None, b=None, ar=None, r=None):
+        self.bus = bus
+        self.clock = clock
+        self._crs = []
+
+        ch = bus.write.aw
+        if aw:
+            self._start(ch.awvalid, ch.awready, aw, lambda ch=ch: AxiAddr(get_sim_time(), _int(getattr(ch, "awid", None)),
+                        int(ch.awaddr.value), _int(getattr(ch, "awlen", None)), _int(getattr(ch, "awsize", None)), _int(getattr(ch, "awburst", None)),
+                        _int(getattr(ch, "awqos", None))))
+        ch = bus.write.w
+        if w:
+            self._start(ch.wvalid, ch.wready, w, lambda ch=ch: AxiBeat(get_sim_time(), 0,
+                        int(ch.wdata.value), _int(getattr(ch, "wstrb", None)), _int(getattr(ch, "wlast", None))))
+        ch = bus.write.b
+        if b:
+            self._start(ch.bvalid, ch.bready, b, lambda ch=ch: AxiBeat(get_sim_time(), _int(getattr(ch, "bid", None)),
+                        0, _int(getattr(ch, "bresp", None)), 1))
+        ch = bus.read.ar
+        if ar:
+            self._start(ch.arvalid, ch.arready, ar, lambda ch=ch: AxiAddr(get_sim_time(), _int(getattr(ch, "arid", None)),
+                        int(ch.araddr.value), _int(getattr(ch, "arlen", None)), _int(getattr(ch, "arsize", None)), _int(getattr(ch, "arburst", None)),
+                        _int(getattr(ch, "arqos", None))))
+        ch = bus.read.r
+        if r:
+            self._start(ch.rvalid, ch.rready, r, lambda ch=ch: AxiBeat(get_sim_time(), _int(getattr(ch, "rid", None)),
+                        int(ch.rdata.value), _int(getattr(ch, "rresp", None)), _int(getattr(ch, "rlast", None))))
+
+    def _start(self, valid, ready, callback, sample):
+        self._crs.append(cocotb.start_soon(self._run(valid, ready, callback, sample)))
+
+    async def _run(self, valid, ready, callback, sample):
+        clock_edge = RisingEdge(self.clock)
+        valid_edge = RisingEdge(valid)
+
+        while True:
+            await clock_edge
+
+            if valid.value:
+                if ready.value:
+                    callback(sample())
+            else:
+                await valid_edge
+
+    def stop(self):
+        for cr in self._crs:
+            cr.kill()
+        self._crs = []
+
+
+class InterconnectScoreboard(object):
+    """
+    Matches the m_axi traffic against the sNN_axi ports of the interconnect:
+
+    - every m_axi AW/AR is the next address accepted on any sNN_axi port, unchanged; that port owns it
+    - m_axi W beats are the W beats of the owners, in the order their AW were accepted
+    - B/R responses of m_axi go back unchanged to the owner of the oldest outstanding transaction with that ID
+    - addresses are accepted from one port at a time: no port is granted while another one has
+      outstanding transactions, and with C_ID_MT_USE = 1 a port only adds transactions with the ID of
+      the outstanding ones
+    """
+    def __init__(self, clock, m_bus, s_buses, id_use=1, log=None):
+        self.s_count = len(s_buses)
+        self.id_use = id_use
+        self.log = log
+        self.errors = []
+
+        self.aw_order = deque()
+        self.ar_order = deque()
+        self.w_owner = deque()
+        self.s_w = [deque() for k in range(self.s_count)]
+
+        self.m_writes = defaultdict(deque)
+        self.m_reads = defaultdict(deque)
+        self.expected_b = [deque() for k in range(self.s_count)]
+        self.expected_r = [deque() for k in range(self.s_count)]
+
+        self.s_writes = [0] * self.s_count
+        self.s_reads = [0] * self.s_count
+        self.s_write_id = [None] * self.s_count
+        self.s_read_id = [None] * self.s_count
+
+        self.write_count = [0] * self.s_count
+        self.read_count = [0] * self.s_count
+
+        self.monitors = [AxiPortMonitor(m_bus, clock, aw=self.m_aw, w=self.m_w, b=self.m_b, ar=self.m_ar, r=self.m_r)]
+        for k, bus in enumerate(s_buses):
+            self.monitors.append(AxiPortMonitor(bus, clock,
+                aw=lambda rec, k=k: self.s_aw(k, rec),
+                w=lambda rec, k=k: self.s_w[k].append(rec),
+                b=lambda rec, k=k: self.s_b(k, rec),
+                ar=lambda rec, k=k: self.s_ar(k, rec),
+                r=lambda rec, k=k: self.s_r(k, rec)))
+
+    def error(self, msg):
+        if self.log:
+            self.log.error("Scoreboard: %s", msg)
+        self.errors.append(msg)
+
+    def _grant(self, k, rec, channel):
+        for j in range(self.s_count):
+            if j != k and (self.s_writes[j] or self.s_reads[j]):
+                self.error(f"s{k:02d}_axi {channel} {rec} accepted while s{j:02d}_axi has {self.s_writes[j]} writes "
+                           f"and {self.s_reads[j]} reads outstanding")
+
+    def s_aw(self, k, rec):
+        self._grant(k, rec, "AW")
+        if self.id_use and self.s_writes[k] and rec.id != self.s_write_id[k]:
+            self.error(f"s{k:02d}_axi AW {rec} accepted with writes of ID {self.s_write_id[k]} outstanding")
+
+        self.s_writes[k] += 1
+        self.s_write_id[k] = rec.id
+        self.aw_order.append((k, rec))
+        self.w_owner.append(k)
+
+    def s_ar(self, k, rec):
+        self._grant(k, rec, "AR")
+        if self.id_use and self.s_reads[k] and rec.id != self.s_read_id[k]:
+            self.error(f"s{k:02d}_axi AR {rec} accepted with reads of ID {self.s_read_id[k]} outstanding")
+
+        self.s_reads[k] += 1
+        self.s_read_id[k] = rec.id
+        self.ar_order.append((k, rec))
+
+    def m_aw(self, rec):
+        if not self.aw_order:
+            self.error(f"m_axi AW {rec} without a slave interface AW")
+            return
+        k, s = self.aw_order.popleft()
+        if rec.fields() != s.fields():
+            self.error(f"m_axi AW {rec} does not match s{k:02d}_axi AW {s}")
+        self.m_writes[rec.id].append(k)
+        self.write_count[k] += 1
+
+    def m_ar(self, rec):
+        if not self.ar_order:
+            self.error(f"m_axi AR {rec} without a slave interface AR")
+            return
+        k, s = self.ar_order.popleft()
+        if rec.fields() != s.fields():
+            self.error(f"m_axi AR {rec} does not match s{k:02d}_axi AR {s}")
+        self.m_reads[rec.id].append(k)
+        self.read_count[k] += 1
+
+    def m_w(self, rec):
+        if not self.w_owner:
+            self.error(f"m_axi W {rec} without a slave interface AW")
+            return
+        k = self.w_owner[0]
+        if not self.s_w[k]:
+            self.error(f"m_axi W {rec} without a s{k:02d}_axi W beat")
+            return
+        s = self.s_w[k].popleft()
+        if rec.fields() != s.fields():
+            self.error(f"m_axi W {rec} does not match s{k:02d}_axi W {s}")
+        if rec.last:
+            self.w_owner.popleft()
+
+    def m_b(self, rec):
+        owners = self.m_writes.get(rec.id)
+        if not owners:
+            self.error(f"m_axi B {rec} without an outstanding write of ID {rec.id}")
+            return
+        self.expected_b[owners.popleft()].append(rec)
+
+    def m_r(self, rec):
+        owners = self.m_reads.get(rec.id)
+        if not owners:
+            self.error(f"m_axi R {rec} without an outstanding read of ID {rec.id}")
+            return
+        self.expected_r[owners[0]].append(rec)
+        if rec.last:
+            owners.popleft()
+
+    def s_b(self, k, rec):
+        if not self.expected_b[k]:
+            self.error(f"s{k:02d}_axi B {rec} was not issued on m_axi for this interface")
+            return
+        m = self.expected_b[k].popleft()
+        if rec.fields() != m.fields():
+            self.error(f"s{k:02d}_axi B {rec} does not match m_axi B {m}")
+        self.s_writes[k] -= 1
+
+    def s_r(self, k, rec):
+        if not self.expected_r[k]:
+            self.error(f"s{k:02d}_axi R {rec} was not issued on m_axi for this interface")
+            return
+        m = self.expected_r[k].popleft()
+        if rec.fields() != m.fields():
+            self.error(f"s{k:02d}_axi R {rec} does not match m_axi R {m}")
+        if rec.last:
+            self.s_reads[k] -= 1
+
+    def stop(self):
+        for monitor in self.monitors:
+            monitor.stop()
+
+    def check(self):
+        """Call once all transactions have completed."""
+        for k in range(self.s_count):
+            if self.s_writes[k] or self.s_reads[k]:
+                self.error(f"s{k:02d}_axi has {self.s_writes[k]} writes and {self.s_reads[k]} reads without response")
+            if self.s_w[k]:
+                self.error(f"s{k:02d}_axi has {len(self.s_w[k])} W beats not forwarded to m_axi")
+        if self.aw_order or self.ar_order:
+            self.error(f"{len(self.aw_order)} AW and {len(self.ar_order)} AR not forwarded to m_axi")
+
+        if self.log:
+            self.log.info("Scoreboard: writes per interface %s, reads per interface %s", self.write_count, self.read_count)
+
+        assert not self.errors, f"{len(self.errors)} scoreboard errors, first: {self.errors[0]}"
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+Binary AXI transaction traces: recording from interconnect ports, loading and replay
+"""
+
+import os
+import json
+import argparse
+from collections import deque
+
+import numpy as np
+
+import cocotb
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time
+
+from axi_scoreboard import AxiPortMonitor
+
+TRACE_VERSION = 1
+
+# Address channels (aw, ar). port is the slave interface index, -1 for m_axi. Write payloads
+# (strobed bytes of all W beats) are stored in data.bin at data_offset, data_length bytes.
+ADDR_DTYPE = np.dtype([
+    ("time", "<u8"),
+    ("port", "<i2"),
+    ("id", "<u4"),
+    ("addr", "<u8"),
+    ("len", "u1"),
+    ("size", "u1"),
+    ("burst", "u1"),
+    ("qos", "u1"),
+    ("data_offset", "<u8"),
+    ("data_length", "<u4")
+])
+
+# Beats and responses (w, b, r), handshake times only
+BEAT_DTYPE = np.dtype([
+    ("time", "<u8"),
+    ("port", "<i2"),
+    ("id", "<u4"),
+    ("resp", "u1"),
+    ("last", "u1")
+])
+
+CHANNELS = dict(aw=ADDR_DTYPE, w=BEAT_DTYPE, b=BEAT_DTYPE, ar=ADDR_DTYPE, r=BEAT_DTYPE)
+
+
+class ChannelWriter(object):
+    """Fixed-size chunk of records, appended to <channel>.bin whenever it fills up."""
+    def __init__(self, path, dtype, chunk=65536):
+        self.file = open(path, 'wb')
+        self.buf = np.zeros(chunk, dtype=dtype)
+        self.n = 0
+        self.count = 0
+
+    def append(self, rec):
+        self.buf[self.n] = rec
+        self.n += 1
+        self.count += 1
+        if self.n == len(self.buf):
+            self.flush()
+        return self.count - 1
+
+    def flush(self):
+        self.buf[:self.n].tofile(self.file)
+        self.n = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class AxiTraceRecorder(object):
+    """
+    Records every handshake on the given ports ({port: AxiBus}, -1 for m_axi) into the trace directory
+    path. Times are in simulator steps. Call close() at the end of the test to write out the trace.
+    """
+    def __init__(self, path, buses, clock, **meta):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.meta = meta
+
+        self.channels = {ch: ChannelWriter(os.path.join(path, f"{ch}.bin"), dtype) for ch, dtype in CHANNELS.items()}
+        self.data_file = open(os.path.join(path, "data.bin"), 'wb')
+        self.data_offset = 0
+
+        # per port: AW records waiting for their payload, payload of the current W burst, complete payloads
+        self.aw_pending = {}
+        self.w_data = {}
+        self.w_done = {}
+        self.byte_lanes = {}
+
+        self.monitors = []
+        for port, bus in buses.items():
+            self.aw_pending[port] = deque()
+            self.w_data[port] = bytearray()
+            self.w_done[port] = deque()
+            self.byte_lanes[port] = len(bus.write.w.wdata) // 8
+
+            self.monitors.append(AxiPortMonitor(bus, clock,
+                aw=lambda rec, port=port: self._aw(port, rec),
+                w=lambda rec, port=port: self._w(port, rec),
+                b=lambda rec, port=port: self.channels["b"].append((rec.time, port, rec.id, rec.extra, 1)),
+                ar=lambda rec, port=port: self.channels["ar"].append((rec.time, port, rec.id, rec.addr, rec.len, rec.size, rec.burst, rec.qos, 0, 0)),
+                r=lambda rec, port=port: self.channels["r"].append((rec.time, port, rec.id, rec.extra, rec.last))))
+
+    def _aw(self, port, rec):
+        self.aw_pending[port].append((rec.time, port, rec.id, rec.addr, rec.len, rec.size, rec.burst, rec.qos))
+        self._match(port)
+
+    def _w(self, port, rec):
+        self.channels["w"].append((rec.time, port, 0, 0, rec.last))
+
+        lanes = self.byte_lanes[port]
+        data = rec.data.to_bytes(lanes, 'little')
+        strb = rec.extra
+        if strb == (1 << lanes) - 1:
+            self.w_data[port] += data
+        else:
+            self.w_data[port] += bytes(data[i] for i in range(lanes) if strb >> i & 1)
+
+        if rec.last:
+            self.w_done[port].append(bytes(self.w_data[port]))
+            self.w_data[port].clear()
+            self._match(port)
+
+    def _match(self, port):
+        # W bursts belong to the AW in order; either one may be seen first
+        while self.aw_pending[port] and self.w_done[port]:
+            aw = self.aw_pending[port].popleft()
+            data = self.w_done[port].popleft()
+            self.channels["aw"].append(aw + (self.data_offset, len(data)))
+            self.data_file.write(data)
+            self.data_offset += len(data)
+
+    def close(self):
+        for monitor in self.monitors:
+            monitor.stop()
+        for ch in self.channels.values():
+            ch.close()
+        self.data_file.close()
+
+        meta = dict(self.meta, version=TRACE_VERSION, time_unit="step",
+                    counts={ch: w.count for ch, w in self.channels.items()})
+        with open(os.path.join(self.path, "trace.json"), 'w') as f:
+            json.dump(meta, f, indent=4)
+
+
+class AxiTrace(object):
+    """A recorded trace, every channel memory-mapped as a structured array, nothing is read up front."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "trace.json"), 'r') as f:
+            self.meta = json.load(f)
+
+        if self.meta.get("version") != TRACE_VERSION:
+            raise ValueError(f"unsupported trace version {self.meta.get('version')}")
+
+        for ch, dtype in CHANNELS.items():
+            setattr(self, ch, self._map(f"{ch}.bin", dtype))
+        self.data = self._map("data.bin", np.uint8)
+
+    def _map(self, name, dtype):
+        filename = os.path.join(self.path, name)
+        if os.path.getsize(filename) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode='r')
+
+    def ports(self):
+        return sorted(set(np.unique(self.aw["port"]).tolist()) | set(np.unique(self.ar["port"]).tolist()))
+
+    def transactions(self, port):
+        """Address records of one port in issue order, as (is_read, records) arrays."""
+        aw = self.aw[self.aw["port"] == port]
+        ar = self.ar[self.ar["port"] == port]
+        records = np.concatenate((aw, ar))
+        is_read = np.concatenate((np.zeros(len(aw), dtype=bool), np.ones(len(ar), dtype=bool)))
+        order = np.argsort(records["time"], kind='stable')
+        return is_read[order], records[order]
+
+
+async def replay_port(trace, master, port, timing="original", window=16, chunk=4096, log=None):
+    """
+    Issues the transactions of one recorded port through an AxiMaster, with at most window outstanding.
+    With timing="original" every transaction starts no earlier than its recorded time (relative to the
+    first transaction of the trace), with "fast" back to back.
+    """
+    is_read, records = trace.transactions(port)
+    if not len(records):
+        return 0
+
+    if timing == "original":
+        t0 = int(min(trace.aw["time"].min(initial=2**63), trace.ar["time"].min(initial=2**63)))
+        start = get_sim_time()
+    outstanding = deque()
+
+    for base in range(0, len(records), chunk):
+        rows = records[base:base+chunk]
+        for read, (time, p, id, addr, len_, size, burst, qos, offset, length) in zip(is_read[base:base+chunk].tolist(), rows.tolist()):
+            if timing == "original":
+                delay = start + time - t0 - get_sim_time()
+                if delay > 0:
+                    await Timer(delay, 'step')
+
+            while len(outstanding) >= window:
+                await outstanding.popleft().wait()
+
+            if read:
+                length = ((len_ + 1) << size) - (addr & ((1 << size) - 1))
+                outstanding.append(master.init_read(addr, length, arid=id, burst=burst, size=size, qos=qos))
+            else:
+                # bytes, not a slice of the memory map: AxiMaster releases that do not convert the data
+                # shift its elements into the beats, and numpy 2 keeps uint8 << j*8 in 8 bits
+                data = trace.data[offset:offset+length].tobytes()
+                outstanding.append(master.init_write(addr, data, awid=id, burst=burst, size=size, qos=qos))
+
+    while outstanding:
+        await outstanding.popleft().wait()
+
+    if log:
+        log.info("Replayed %d transactions on port %d", len(records), port)
+
+    return len(records)
+
+
+async def replay(trace, masters, timing="original", window=16, log=None):
+    """Replays every recorded slave interface port k through masters[k], all ports concurrently."""
+    workers = [cocotb.start_soon(replay_port(trace, masters[port], port, timing, window, log=log))
+               for port in trace.ports() if 0 <= port < len(masters)]
+
+    count = 0
+    while workers:
+        count += await workers.pop(0).join()
+    return count
+
+
+def write_image(trace):
+    """
+    Memory the slave interface writes of trace leave behind, as (address, bytes) runs. INCR bursts of a
+    port reach the memory in recorded order, later ones overwriting earlier ones; bytes written by more
+    than one port are left out, their order depends on arbitration.
+    """
+    aw = trace.aw[(trace.aw["port"] >= 0) & (trace.aw["burst"] == 1)]
+    aw = aw[np.argsort(aw["time"], kind='stable')]
+    lengths = aw["data_length"].astype(np.int64)
+    if not lengths.sum():
+        return []
+
+    # one element per written byte
+    index = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    addr = np.repeat(aw["addr"].astype(np.int64), lengths) + index
+    data = trace.data[np.repeat(aw["data_offset"].astype(np.int64), lengths) + index]
+    port = np.repeat(aw["port"].astype(np.int64), lengths)
+
+    # (address, port) pairs sorted by address, an address in two of them is shared by ports
+    pairs = np.unique(np.stack((addr, port)), axis=1)[0]
+    shared = pairs[1:][np.diff(pairs) == 0]
+
+    # last write of every address
+    addr, last = np.unique(addr[::-1], return_index=True)
+    data = data[::-1][last]
+    keep = ~np.isin(addr, shared)
+    addr, data = addr[keep], data[keep]
+
+    runs = np.split(np.arange(len(addr)), np.flatnonzero(np.diff(addr) != 1) + 1)
+    return [(int(addr[r[0]]), data[r].tobytes()) for r in runs]
+
+
+def summarize(path):
+    trace = AxiTrace(path)
+
+    print(f"{path}: {', '.join(f'{n} {ch}' for ch, n in trace.meta['counts'].items())}, {len(trace.data)} bytes of write data")
+    for port in trace.ports():
+        aw = trace.aw[trace.aw["port"] == port]
+        ar = trace.ar[trace.ar["port"] == port]
+        name = "m_axi" if port < 0 else f"s{port:02d}_axi"
+        print(f"  {name}: {len(aw)} writes ({int(aw['data_length'].sum())} bytes), {len(ar)} reads")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('trace', type=str, nargs='+', help="trace directory")
+
+    args = parser.parse_args()
+
+    for path in args.trace:
+        summarize(path)
+
+if __name__ == "__main__":
+    main()
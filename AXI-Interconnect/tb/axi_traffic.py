@@ -0,0 +1,178 @@
+"""
+Declarative AXI traffic generator for the interconnect testbench
+"""
+
+import numpy as np
+
+import cocotb
+
+import tbutils
+
+# Traffic of one master. Distributions are a constant, a (low, high) tuple for a uniform integer range
+# (inclusive), a list of equally likely values or a {value: weight} dict.
+DEFAULT_SPEC = dict(
+    count=16,               # transactions per master
+    read_ratio=0.5,         # fraction of reads
+    length=(1, 512),        # bytes per transaction, ignored when beats is given
+    beats=None,             # burst length in beats of 2**size bytes
+    size=None,              # AxSIZE, None for the full bus width
+    pattern="random",       # address pattern: sequential, strided, random or hotspot
+    base=0,                 # start of the region of master 0
+    aperture=0x1000,        # bytes per master, master k uses base + k*aperture
+    stride=256,             # strided pattern: bytes between transaction start addresses
+    hotspot=(0.8, 0x100),   # hotspot pattern: fraction of transactions going to the first N bytes
+    rate=1.0,               # probability of starting the next transaction in a given cycle
+    outstanding=1,          # concurrent transaction streams, each in its own slice of the aperture
+    qos=0,                  # AxQOS
+    verify=True             # prefill read data and check written data through the slave memory
+)
+
+PATTERNS = ("sequential", "strided", "random", "hotspot")
+
+_pattern = memoryview(b"")
+
+
+def pattern_buffer(length):
+    """Shared payload buffer, bytes 0..255 repeating, holding any slice of length bytes at offsets 0..255."""
+    global _pattern
+    if len(_pattern) < length + 256:
+        _pattern = memoryview(bytes(range(256)) * ((length + 511) // 256))
+    return _pattern
+
+
+def sample(rng, dist, count):
+    if dist is None or isinstance(dist, (int, np.integer)):
+        return np.full(count, dist if dist is not None else -1, dtype=np.int64)
+    if isinstance(dist, tuple):
+        return rng.integers(dist[0], dist[1], count, endpoint=True)
+    if isinstance(dist, dict):
+        values = np.array(list(dist.keys()), dtype=np.int64)
+        weights = np.array(list(dist.values()), dtype=float)
+        return rng.choice(values, count, p=weights / weights.sum())
+    return rng.choice(np.array(dist, dtype=np.int64), count)
+
+
+def plan(spec, byte_lanes, rng, base):
+    """Arrays of every transaction of one stream: read flag, address, length, AxSIZE and idle cycles before it."""
+    count = spec["count"]
+    aperture = spec["aperture"]
+    max_size = (byte_lanes - 1).bit_length()
+
+    size = sample(rng, spec["size"], count)
+    size = np.where(size < 0, max_size, np.minimum(size, max_size))
+
+    if spec["beats"] is not None:
+        length = sample(rng, spec["beats"], count) << size
+    else:
+        length = sample(rng, spec["length"], count)
+    length = np.clip(length, 1, aperture)
+
+    room = aperture - length
+    pattern = spec["pattern"]
+    if pattern == "sequential":
+        offset = np.concatenate(([0], np.cumsum(length[:-1]))) % aperture
+        offset = np.where(offset > room, 0, offset)
+    elif pattern == "strided":
+        offset = (np.arange(count) * spec["stride"]) % aperture
+        offset = np.where(offset > room, 0, offset)
+    elif pattern == "random":
+        offset = (rng.random(count) * (room + 1)).astype(np.int64)
+    elif pattern == "hotspot":
+        fraction, hot = spec["hotspot"]
+        span = np.where(rng.random(count) < fraction, np.minimum(hot, aperture), aperture) - length
+        offset = (rng.random(count) * (np.maximum(span, 0) + 1)).astype(np.int64)
+    else:
+        raise ValueError(f"unknown address pattern {pattern}, expected one of {PATTERNS}")
+
+    rate = spec["rate"]
+    if not 0 < rate <= 1:
+        raise ValueError(f"issue rate {rate} out of range, expected 0 < rate <= 1")
+    gap = rng.geometric(rate, count) - 1 if rate < 1 else np.zeros(count, dtype=np.int64)
+
+    return dict(
+        read=rng.random(count) < spec["read_ratio"],
+        addr=base + offset,
+        length=length,
+        size=size,
+        gap=gap,
+        data=rng.integers(0, 256, count)
+    )
+
+
+class TrafficGenerator(object):
+    """
+    Drives AxiMaster instances from a spec, see DEFAULT_SPEC. spec applies to every master,
+    masters_spec={k: {...}} overrides entries for single masters. All random choices are made up front,
+    payloads are slices of the shared pattern buffer. With verify, ram is the slave memory
+    (anything with read and write) used to prefill read data and to check written data.
+    """
+    def __init__(self, masters, clock, ram=None, spec=None, masters_spec=None, seed=None, log=None):
+        self.masters = masters
+        self.clock = clock
+        self.ram = ram
+        self.log = log
+        self.rng = np.random.default_rng(seed)
+
+        spec = dict(DEFAULT_SPEC, **(spec or {}))
+        masters_spec = masters_spec or {}
+        self.specs = [dict(spec, **masters_spec.get(k, {})) for k in range(len(masters))]
+
+        self.stats = [dict(reads=0, writes=0, read_bytes=0, write_bytes=0) for m in masters]
+
+    async def _stream(self, k, master, spec, base):
+        t = plan(spec, master.write_if.byte_lanes, self.rng, base)
+        pattern = pattern_buffer(int(t["length"].max()))
+        stats = self.stats[k]
+        verify = spec["verify"] and self.ram is not None
+        # guard bands around writes when the slave memory supports them (paged_memory.PagedMemory)
+        mem = getattr(self.ram, "mem", None) if verify else None
+        guards = hasattr(mem, "guard")
+        end = base + spec["aperture"]
+        qos = spec["qos"]
+
+        for read, addr, length, size, gap, start in zip(t["read"].tolist(), t["addr"].tolist(), t["length"].tolist(),
+                                                        t["size"].tolist(), t["gap"].tolist(), t["data"].tolist()):
+            if gap:
+                await tbutils.wait_cycles(self.clock, gap)
+
+            data = pattern[start:start+length]
+
+            if read:
+                if verify:
+                    self.ram.write(addr, data)
+                resp = await master.read(addr, length, size=size, qos=qos)
+                if verify:
+                    assert resp.data == data, f"master {k}: read of {length} bytes at {addr:#x} returned wrong data"
+                stats["reads"] += 1
+                stats["read_bytes"] += length
+            else:
+                if guards:
+                    guard = mem.guard(addr, length, margin=min(128, addr - base, end - addr - length))
+                await master.write(addr, data, size=size, qos=qos)
+                if verify:
+                    assert self.ram.read(addr, length) == data, f"master {k}: write of {length} bytes at {addr:#x} did not arrive"
+                if guards:
+                    assert not mem.unguard(guard), f"master {k}: write of {length} bytes at {addr:#x} hit the guard bands"
+                stats["writes"] += 1
+                stats["write_bytes"] += length
+
+    async def run(self):
+        workers = []
+
+        for k, (master, spec) in enumerate(zip(self.masters, self.specs)):
+            streams = spec["outstanding"]
+            aperture = spec["aperture"] // streams
+            stream_spec = dict(spec, count=spec["count"] // streams, aperture=aperture)
+            for n in range(streams):
+                base = spec["base"] + k*spec["aperture"] + n*aperture
+                workers.append(cocotb.start_soon(self._stream(k, master, stream_spec, base)))
+
+        while workers:
+            await workers.pop(0).join()
+
+        if self.log:
+            for k, s in enumerate(self.stats):
+                self.log.info("master %d: %d reads (%d bytes), %d writes (%d bytes)",
+                              k, s["reads"], s["read_bytes"], s["writes"], s["write_bytes"])
+
+        return self.stats
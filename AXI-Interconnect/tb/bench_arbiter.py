@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""
+Arbiter scaling benchmark over PORTS and the arbitration policy flags
+
+Every point is a testbench top generated for one PORTS value and policy, driven by requesters that
+hold their request until it is granted, keep the grant for a number of cycles and then release it.
+Reported per point: grants per cycle, fraction of cycles with a valid grant, grant latency (request
+to grant, in cycles) and the worst wait of every requester. --model computes the same numbers with
+the NumPy model of the arbiter instead of the simulator.
+"""
+
+import os
+import json
+import argparse
+import itertools
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import cocotb
+from cocotb.triggers import RisingEdge, FallingEdge
+from cocotb.regression import TestFactory
+
+from jinja2 import Template
+
+from wrapper_cache import atomic_write
+from build_cache import BuildCache, default_cache_dir
+from arbiter_model import ArbiterModel
+from test_arbiter import TB, tbutils
+
+# (ARB_TYPE_ROUND_ROBIN, ARB_BLOCK, ARB_BLOCK_ACK, ARB_LSB_HIGH_PRIORITY)
+POLICIES = list(itertools.product([0, 1], repeat=4))
+
+TOP_TEMPLATE = Template("""`default_nettype wire
+`resetall
+`timescale 1ns / 1ps
+
+/*
+ * Arbiter benchmark testbench, generated by bench_arbiter.py
+ */
+
+module {{ name }} # (
+    parameter PORTS = {{ ports }},
+    parameter ARB_TYPE_ROUND_ROBIN = {{ round_robin }},
+    parameter ARB_BLOCK = {{ block }},
+    parameter ARB_BLOCK_ACK = {{ block_ack }},
+    parameter ARB_LSB_HIGH_PRIORITY = {{ lsb_priority }}
+)
+(
+    input logic clk,
+    input logic resetn,
+
+    input logic [PORTS-1:0] request,
+    input logic [PORTS-1:0] acknowledge,
+
+    output logic [PORTS-1:0]         grant,
+    output logic                     grant_valid,
+    output logic [$clog2(PORTS)-1:0] grant_encoded
+);
+
+arbiter # (
+    .PORTS(PORTS),
+    .ARB_TYPE_ROUND_ROBIN(ARB_TYPE_ROUND_ROBIN),
+    .ARB_BLOCK(ARB_BLOCK),
+    .ARB_BLOCK_ACK(ARB_BLOCK_ACK),
+    .ARB_LSB_HIGH_PRIORITY(ARB_LSB_HIGH_PRIORITY)
+) arbiter_inst (
+    .clk(clk),
+    .resetn(resetn),
+    .request(request),
+    .acknowledge(acknowledge),
+    .grant(grant),
+    .grant_valid(grant_valid),
+    .grant_encoded(grant_encoded)
+);
+{% if waves %}
+initial begin
+    $dumpfile("{{ name }}.vcd");
+    $dumpvars;
+end
+{% endif %}
+endmodule
+
+`resetall
+""")
+
+
+def top_name(ports, round_robin, block, block_ack, lsb_priority):
+    return f"arbiter_bench_{ports}_{round_robin}{block}{block_ack}{lsb_priority}"
+
+
+def generate_top(output_dir, ports, round_robin, block, block_ack, lsb_priority, waves=False):
+    """Writes the testbench top of one point, only when its contents change so cached builds stay valid."""
+    if not 2 <= ports <= 64:
+        raise ValueError("PORTS must be between 2 and 64")
+
+    name = top_name(ports, round_robin, block, block_ack, lsb_priority)
+    text = TOP_TEMPLATE.render(name=name, ports=ports, round_robin=round_robin, block=block,
+                               block_ack=block_ack, lsb_priority=lsb_priority, waves=waves)
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{name}.sv")
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            if f.read() == text:
+                return path
+    atomic_write(path, text)
+    return path
+
+
+class Requesters(object):
+    """
+    Closed loop requesters of any number of independent arbiters (lanes). An idle port raises its
+    request with probability load in every cycle and holds it until it is granted. A granted port keeps
+    its request for hold cycles, then drops it and acknowledges the grant in the same cycle.
+    """
+    def __init__(self, ports, lanes=1, load=1.0, hold=1, rng=None):
+        self.ports = ports
+        self.lanes = lanes
+        self.load = load
+        self.hold = hold
+        self.rng = rng or np.random.default_rng()
+
+        self.shift = np.arange(ports, dtype=np.uint64)
+        self.weights = np.uint64(1) << self.shift
+
+        self.waiting = np.zeros((lanes, ports), dtype=bool)
+        self.busy = np.zeros((lanes, ports), dtype=np.int64)
+        self.wait = np.zeros((lanes, ports), dtype=np.int64)
+
+        self.latencies = []
+        self.worst = np.zeros(ports, dtype=np.int64)
+        self.grants = np.zeros(ports, dtype=np.int64)
+        self.valid_cycles = 0
+        self.cycles = 0
+
+    def step(self, grant, grant_valid):
+        """Takes the outputs after a clock edge, returns request and acknowledge for the next one."""
+        grant = np.asarray(grant, dtype=np.uint64).reshape(self.lanes)
+        grant_valid = np.asarray(grant_valid, dtype=bool).reshape(self.lanes)
+        granted = (((grant[:, None] >> self.shift) & np.uint64(1)) != 0) & grant_valid[:, None]
+
+        self.cycles += 1
+        self.valid_cycles += int(grant_valid.sum())
+
+        # waiting ports that got their grant
+        served = granted & self.waiting
+        if served.any():
+            self.latencies.append(self.wait[served])
+            np.maximum(self.worst, np.where(served, self.wait, 0).max(axis=0), out=self.worst)
+            self.grants += served.sum(axis=0)
+            self.waiting &= ~served
+            self.busy[served] = self.hold
+
+        # ports at the end of their hold time release the grant
+        active = self.busy > 0
+        self.busy[active] -= 1
+        release = active & (self.busy == 0)
+
+        arrive = ~self.waiting & ~active & (self.rng.random((self.lanes, self.ports)) < self.load)
+        self.wait[arrive] = 0
+        self.waiting |= arrive
+        self.wait[self.waiting] += 1
+
+        request = ((self.waiting | (active & ~release)) * self.weights).sum(axis=1, dtype=np.uint64)
+        acknowledge = (release * self.weights).sum(axis=1, dtype=np.uint64)
+        return request, acknowledge
+
+    def report(self):
+        latency = np.concatenate(self.latencies) if self.latencies else np.zeros(0, dtype=np.int64)
+        # requests still waiting count with their age, a starved port has no grants but a long wait
+        worst = np.maximum(self.worst, np.where(self.waiting, self.wait, 0).max(axis=0))
+        slots = self.cycles * self.lanes
+        return dict(
+            cycles=self.cycles,
+            lanes=self.lanes,
+            grants=int(self.grants.sum()),
+            grants_per_cycle=float(self.grants.sum() / slots) if slots else 0.0,
+            utilization=float(self.valid_cycles / slots) if slots else 0.0,
+            latency_mean=float(latency.mean()) if len(latency) else 0.0,
+            latency_p99=float(np.percentile(latency, 99)) if len(latency) else 0.0,
+            latency_max=int(latency.max()) if len(latency) else 0,
+            worst_wait=worst.tolist(),
+            starved=int(((self.grants == 0) & (worst > 0)).sum())
+        )
+
+
+def model_point(ports, round_robin, block, block_ack, lsb_priority, load=1.0, hold=1, cycles=10000, lanes=64, seed=None):
+    """Benchmark of one point on the NumPy model, lanes independent arbiters run in parallel."""
+    model = ArbiterModel(ports, round_robin, block, block_ack, lsb_priority)
+    model.reset(lanes)
+    requesters = Requesters(ports, lanes, load, hold, np.random.default_rng(seed))
+
+    grant, grant_valid = model.grant, model.grant_valid
+    for t in range(cycles):
+        request, acknowledge = requesters.step(grant, grant_valid)
+        grant, grant_valid, _ = model.step(request, acknowledge)
+
+    result = dict(ports=ports, round_robin=round_robin, block=block, block_ack=block_ack, lsb_priority=lsb_priority,
+                  load=load, hold=hold)
+    result.update(requesters.report())
+    return result
+
+
+async def run_benchmark(dut, load=1.0):
+    tb = TB(dut)
+
+    cycles = int(os.environ.get("ARBITER_CYCLES", 10000))
+    hold = int(os.environ.get("ARBITER_HOLD", 1))
+
+    tb.dut.request.value = 0
+    tb.dut.acknowledge.value = 0
+
+    await tb.cycle_reset()
+
+    requesters = Requesters(tb.ports, 1, load, hold, tb.rng)
+    tb.model.reset()
+
+    # inputs change on the falling edge, the outputs of the previous rising edge are sampled there too
+    await FallingEdge(dut.clk)
+
+    actual = (0, 0, 0)
+    for t in range(cycles):
+        request, acknowledge = requesters.step(actual[0], actual[1])
+        request, acknowledge = int(request[0]), int(acknowledge[0])
+        tb.dut.request.value = request
+        tb.dut.acknowledge.value = acknowledge
+
+        expected = tuple(int(x) for x in tb.model.step(request, acknowledge))
+        await FallingEdge(dut.clk)
+
+        actual = tb.sample()
+        tb.check(t, request, acknowledge, actual, expected)
+
+    result = dict(
+        ports=tb.ports,
+        round_robin=int(tb.round_robin),
+        block=int(tb.block),
+        block_ack=int(tb.block_ack),
+        lsb_priority=int(tb.lsb_priority),
+        load=load,
+        hold=hold,
+        **requesters.report()
+    )
+
+    tb.log.info("%.3f grants/cycle, latency mean %.2f max %d, worst wait %d cycles",
+                result["grants_per_cycle"], result["latency_mean"], result["latency_max"], max(result["worst_wait"]))
+
+    with open(os.environ.get("BENCH_RESULT", "bench_result.jsonl"), 'a') as f:
+        f.write(json.dumps(result) + "\n")
+
+    await RisingEdge(dut.clk)
+
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(run_benchmark)
+    factory.add_option("load", [float(x) for x in os.environ.get("ARBITER_LOAD", "1.0").split(",")])
+    factory.generate_tests()
+
+# cocotb-test
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+# generated tops are build products, next to the builds
+tops_dir = os.path.join(tbutils.sim_build_dir(tests_dir), 'arbiter_tops')
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
+
+def bench_point(ports, policy, result_file, loads, hold, cycles, waves=False):
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = top_name(ports, *policy)
+
+    build_cache = BuildCache(default_cache_dir(tests_dir))
+
+    verilog_sources = [
+        generate_top(tops_dir, ports, *policy, waves=waves),
+        os.path.join(rtl_dir, "priority_encoder.sv"),
+        os.path.join(rtl_dir, "arbiter.sv")
+    ]
+
+    build_cache.run(
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        timescale='1ns/1ps',
+        extra_env={
+            "BENCH_RESULT": result_file,
+            "ARBITER_LOAD": ",".join(str(x) for x in loads),
+            "ARBITER_HOLD": str(hold),
+            "ARBITER_CYCLES": str(cycles)
+        }
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-p', '--ports', type=int, default=[2, 4, 8, 16, 32, 64], nargs='+', help="PORTS values (2..64)")
+    parser.add_argument('--policy', type=str, nargs='+', help="policies as RBAL flag strings, e.g. 1111 (default: all 16)")
+    parser.add_argument('-l', '--load', type=float, default=[1.0], nargs='+', help="request probability of an idle port per cycle")
+    parser.add_argument('--hold', type=int, default=1, help="cycles a granted port keeps the grant")
+    parser.add_argument('-c', '--cycles', type=int, default=10000, help="cycles per point")
+    parser.add_argument('-m', '--model', action='store_true', help="use the NumPy model instead of the simulator")
+    parser.add_argument('--lanes', type=int, default=64, help="independent arbiters per point with --model")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="number of worker processes with --model")
+    parser.add_argument('-w', '--waves', action='store_true', help="dump waveforms of the generated tops")
+    parser.add_argument('-o', '--output', type=str, default="bench_arbiter.json", help="output JSON file")
+
+    args = parser.parse_args()
+
+    policies = [tuple(int(c) for c in p) for p in args.policy] if args.policy else POLICIES
+
+    if args.model:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [executor.submit(model_point, ports, *policy, load=load, hold=args.hold, cycles=args.cycles, lanes=args.lanes, seed=ports)
+                       for ports, policy, load in itertools.product(args.ports, policies, args.load)]
+            points = [f.result() for f in futures]
+    else:
+        result_file = os.path.abspath(args.output + ".jsonl")
+        if os.path.exists(result_file):
+            os.remove(result_file)
+
+        for ports, policy in itertools.product(args.ports, policies):
+            bench_point(ports, policy, result_file, args.load, args.hold, args.cycles, args.waves)
+
+        with open(result_file, 'r') as f:
+            points = [json.loads(line) for line in f]
+        os.remove(result_file)
+
+    # RTL revision the numbers belong to, for comparing runs
+    revision = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=rtl_dir, capture_output=True, text=True).stdout.strip()
+
+    with open(args.output, 'w') as f:
+        json.dump(dict(revision=revision, model=args.model, points=points), f, indent=4)
+
+    print(f"{'PORTS':>5} {'RBAL':>4} {'load':>5} {'grants/cycle':>12} {'util':>5} {'lat mean':>8} {'lat p99':>7} {'worst wait':>10} {'starved':>7}")
+    for p in points:
+        policy = f"{p['round_robin']}{p['block']}{p['block_ack']}{p['lsb_priority']}"
+        print(f"{p['ports']:5d} {policy:>4} {p['load']:5.2f} {p['grants_per_cycle']:12.3f} {p['utilization']:5.2f} "
+              f"{p['latency_mean']:8.2f} {p['latency_p99']:7.1f} {max(p['worst_wait']):10d} {p['starved']:7d}")
+
+if __name__ == "__main__":
+    main()
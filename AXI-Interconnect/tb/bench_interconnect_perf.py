@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Bandwidth and latency benchmark of the AXI Many to One Interconnect over a parameter matrix
+"""
+
+import os
+import json
+import argparse
+import itertools
+import subprocess
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from wrapper_cache import WrapperCache
+from build_cache import BuildCache, default_cache_dir
+from axi_perf import AxiPerfMonitor
+from test_axi_many_to_one_interconnect import TB
+from pause_patterns import CYCLE_PAUSE
+
+
+async def run_benchmark(dut, idle_inserter=None, backpressure_inserter=None, burst_beats=16, count=32):
+    tb = TB(dut)
+
+    await tb.cycle_reset()
+
+    tb.set_idle_pattern(idle_inserter)
+    tb.set_backpressure_pattern(backpressure_inserter)
+
+    byte_lanes = tb.axi_masters[0].write_if.byte_lanes
+    length = burst_beats * byte_lanes
+    test_data = bytes(length)
+
+    # every master keeps one write and one read stream busy in its own region
+    async def writer(master, offset):
+        for k in range(count):
+            await master.write(offset + (k * length) % 0x8000, test_data)
+
+    async def reader(master, offset):
+        for k in range(count):
+            await master.read(offset + (k * length) % 0x8000, length)
+
+    monitor = AxiPerfMonitor(dut.clk, tb.m_bus, tb.s_buses)
+    monitor.start()
+
+    workers = []
+    for k, master in enumerate(tb.axi_masters):
+        workers.append(cocotb.start_soon(writer(master, k*0x10000)))
+        workers.append(cocotb.start_soon(reader(master, k*0x10000 + 0x8000)))
+
+    while workers:
+        await workers.pop(0).join()
+
+    monitor.stop()
+
+    result = dict(
+        s_count=tb.s_count,
+        data_width=tb.data_width,
+        id_use=int(dut.C_ID_MT_USE.value),
+        idle=idle_inserter is not None,
+        backpressure=backpressure_inserter is not None,
+        burst_beats=burst_beats,
+        **monitor.report()
+    )
+
+    tb.log.info("%d bytes in %d cycles, %.3f bytes/cycle", result["bytes"], result["cycles"], result["bytes_per_cycle"])
+
+    with open(os.environ.get("BENCH_RESULT", "bench_result.jsonl"), 'a') as f:
+        f.write(json.dumps(result) + "\n")
+
+    await RisingEdge(dut.clk)
+
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(run_benchmark)
+    factory.add_option("idle_inserter", [None, CYCLE_PAUSE])
+    factory.add_option("backpressure_inserter", [None, CYCLE_PAUSE])
+    factory.generate_tests()
+
+# cocotb-test
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+wrappers_dir = os.path.abspath(os.path.join(tests_dir, 'wrappers'))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
+
+def bench_point(s_count, data_width, id_use, result_file):
+    dut = "axi_many_to_one_interconnect"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = f"{dut}_wrap_{s_count}_{data_width}_{id_use}"
+
+    wrapper_cache = WrapperCache(wrappers_dir, os.path.join(rtl_dir, f"{dut}_wrap.py"))
+    build_cache = BuildCache(default_cache_dir(tests_dir))
+
+    verilog_sources = [
+        wrapper_cache.get(s_count, data_width, id_use),
+        os.path.join(rtl_dir, f"{dut}.sv"),
+        os.path.join(rtl_dir, "priority_encoder.sv"),
+        os.path.join(rtl_dir, "arbiter.sv")
+    ]
+
+    build_cache.run(
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        timescale='1ns/1ps',
+        extra_env={"BENCH_RESULT": result_file}
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-s', '--s_count', type=int, default=[1, 4, 8], nargs='+', help="number of slave interfaces")
+    parser.add_argument('-d', '--data_width', type=int, default=[32, 128, 512], nargs='+', help="width of data channel")
+    parser.add_argument('-i', '--id_use', type=int, default=[0, 1], nargs='+', help="usage of ID signals for multi-transaction control")
+    parser.add_argument('-o', '--output', type=str, default="bench_interconnect_perf.json", help="output JSON file")
+
+    args = parser.parse_args()
+
+    result_file = os.path.abspath(args.output + ".jsonl")
+    if os.path.exists(result_file):
+        os.remove(result_file)
+
+    for s_count, data_width, id_use in itertools.product(args.s_count, args.data_width, args.id_use):
+        bench_point(s_count, data_width, id_use, result_file)
+
+    with open(result_file, 'r') as f:
+        points = [json.loads(line) for line in f]
+    os.remove(result_file)
+
+    # RTL revision the numbers belong to, for comparing runs
+    revision = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=rtl_dir, capture_output=True, text=True).stdout.strip()
+
+    with open(args.output, 'w') as f:
+        json.dump(dict(revision=revision, points=points), f, indent=4)
+
+    for p in points:
+        per_master = ", ".join(f"{m['bytes_per_cycle']:.2f}" for m in p["masters"])
+        print(f"S_COUNT = {p['s_count']}, C_DATA_WIDTH = {p['data_width']}, C_ID_MT_USE = {p['id_use']}, "
+              f"idle = {p['idle']:d}, backpressure = {p['backpressure']:d}: "
+              f"{p['bytes_per_cycle']:.2f} bytes/cycle (masters: {per_master})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Elaboration and testbench construction benchmark for the flat and array wrapper port styles
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import cocotb
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiBus, AxiMaster
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import tbutils
+
+from wrapper_cache import WrapperCache
+from axi_bus_binding import axi_slave_buses
+
+
+async def run_bench_construction(dut):
+    s_count = dut.C_S_COUNT.value
+    result = {}
+
+    start = time.perf_counter()
+    buses = axi_slave_buses(dut, s_count)
+    result["bus_binding"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _ = [AxiMaster(bus, dut.clk, dut.resetn, reset_active_level=False) for bus in buses]
+    result["masters"] = time.perf_counter() - start
+
+    # reference: stock cocotbext-axi name lookup, only possible on flat wrappers
+    if not hasattr(dut, "s_axi_awvalid"):
+        start = time.perf_counter()
+        _ = [AxiBus.from_prefix(dut, f"s{k:02d}_axi") for k in range(s_count)]
+        result["from_prefix_binding"] = time.perf_counter() - start
+
+    with open(os.environ["BENCH_RESULT"], 'w') as f:
+        json.dump(result, f)
+
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(run_bench_construction)
+    factory.generate_tests()
+
+# cocotb-test
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+wrappers_dir = os.path.abspath(os.path.join(tests_dir, 'wrappers'))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
+
+def bench_point(s_count, data_width, ports):
+    dut = "axi_many_to_one_interconnect"
+    toplevel = f"{dut}_wrap_{s_count}_{data_width}_1"
+
+    wrapper_cache = WrapperCache(wrappers_dir, os.path.join(rtl_dir, f"{dut}_wrap.py"))
+    wrapper_file = wrapper_cache.get(s_count, data_width, 1, ports=ports)
+
+    verilog_sources = [
+        wrapper_file,
+        os.path.join(rtl_dir, f"{dut}.sv"),
+        os.path.join(rtl_dir, "priority_encoder.sv"),
+        os.path.join(rtl_dir, "arbiter.sv")
+    ]
+
+    sim_build = f"bench_{ports}_{s_count}_{data_width}"
+    result_file = os.path.join(tbutils.sim_build_dir(tests_dir), sim_build, "bench_result.json")
+
+    run_args = dict(sim_build=sim_build, extra_env={"BENCH_RESULT": result_file})
+
+    start = time.perf_counter()
+    tbutils.run(__file__, toplevel, verilog_sources, compile_only=True, force_compile=True, **run_args)
+    compile_time = time.perf_counter() - start
+
+    # sources are up to date now, so this is simulator startup, elaboration (for simulators
+    # that elaborate at load time) and the construction test only
+    start = time.perf_counter()
+    tbutils.run(__file__, toplevel, verilog_sources, **run_args)
+    run_time = time.perf_counter() - start
+
+    with open(result_file, 'r') as f:
+        result = json.load(f)
+
+    result.update(s_count=s_count, data_width=data_width, ports=ports, compile=compile_time, run=run_time,
+                  wrapper_size=os.path.getsize(wrapper_file))
+
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-s', '--s_count', type=int, default=[8, 32, 64], nargs='+', help="number of slave interfaces")
+    parser.add_argument('-d', '--data_width', type=int, default=32, help="width of data channel")
+    parser.add_argument('-o', '--output', type=str, default="bench_wrapper_ports.json", help="output JSON file")
+
+    args = parser.parse_args()
+
+    results = []
+    for s_count in args.s_count:
+        for ports in ["flat", "array"]:
+            result = bench_point(s_count, args.data_width, ports)
+            results.append(result)
+
+            print(f"S_COUNT = {s_count:3d} {ports:5s}: wrapper {result['wrapper_size']:8d} B, "
+                  f"compile {result['compile']:7.3f} s, run {result['run']:7.3f} s, "
+                  f"binding {result['bus_binding']*1000:8.2f} ms, masters {result['masters']*1000:8.2f} ms"
+                  + (f", from_prefix {result['from_prefix_binding']*1000:8.2f} ms" if 'from_prefix_binding' in result else ""))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Persistent compiled-simulation build cache, and a summary of compile vs simulation time
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+
+import cocotb_test.simulator
+
+from wrapper_cache import FileLock
+
+# simulators that apply parameter overrides when loading the design rather than when compiling it,
+# so one compiled model serves every parameter set
+RUNTIME_PARAMETER_SIMS = ("questa", "riviera", "activehdl")
+
+# simulator arguments that change the compiled model
+COMPILE_ARGS = ("toplevel", "timescale", "defines", "includes", "compile_args", "verilog_compile_args", "extra_args")
+
+
+def touch_tree(path):
+    # cocotb-test recompiles when any source is newer than its output; sources here are matched
+    # by content, so a touched but unchanged file must not trigger a rebuild
+    now = time.time()
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            os.utime(os.path.join(root, f), (now, now))
+
+
+def default_cache_dir(tests_dir):
+    # shared by all jobs, unlike the sim_build directories run_regression.py gives every job
+    return os.environ.get("BUILD_CACHE_DIR", os.path.join(tests_dir, "sim_build", "cache"))
+
+
+class BuildCache(object):
+    """
+    Compiled models are kept in <cache_dir>/<toplevel>.<key>, where key is a hash of the source file
+    contents, the simulator, the compile arguments and, for simulators that bind parameters at
+    compile time, the parameters. Every run appends its compile and simulation times to timings.jsonl.
+
+    The simulation itself runs in its own directory, the sim_build of the run, with the cached model
+    only as the compiled design: waves, results and files the test writes to its working directory
+    are not shared between runs of the same model.
+    """
+    def __init__(self, cache_dir, simulator=None):
+        self.cache_dir = cache_dir
+        self.simulator = (simulator or os.environ.get("SIM", "icarus")).lower()
+        self.timings_file = os.path.join(cache_dir, "timings.jsonl")
+
+    @property
+    def runtime_parameters(self):
+        return self.simulator in RUNTIME_PARAMETER_SIMS
+
+    def key(self, verilog_sources, parameters, **kwargs):
+        h = hashlib.sha256(self.simulator.encode())
+
+        for source in verilog_sources:
+            with open(source, 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+
+        compile_args = {k: kwargs.get(k) for k in COMPILE_ARGS}
+        if not self.runtime_parameters:
+            compile_args["parameters"] = parameters
+
+        h.update(json.dumps(compile_args, sort_keys=True).encode())
+
+        return h.hexdigest()[:16]
+
+    def run(self, verilog_sources, toplevel, parameters=None, sim_build=None, **kwargs):
+        parameters = parameters or {}
+        key = self.key(verilog_sources, parameters, toplevel=toplevel, **kwargs)
+        work_dir = os.path.abspath(sim_build or os.path.join(os.path.dirname(self.cache_dir), toplevel))
+        sim_build = os.path.join(self.cache_dir, f"{toplevel}.{key}")
+        marker = os.path.join(sim_build, ".complete")
+
+        run_args = dict(kwargs, verilog_sources=verilog_sources, toplevel=toplevel, parameters=parameters, sim_build=sim_build)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        os.makedirs(work_dir, exist_ok=True)
+
+        compile_time = 0.0
+        hit = True
+
+        with FileLock(sim_build + ".lock"):
+            if os.path.exists(marker):
+                touch_tree(sim_build)
+            else:
+                hit = False
+                start = time.perf_counter()
+                cocotb_test.simulator.run(compile_only=True, force_compile=True, **run_args)
+                compile_time = time.perf_counter() - start
+
+                os.makedirs(sim_build, exist_ok=True)
+                with open(marker, 'w') as f:
+                    f.write(json.dumps(dict(toplevel=toplevel, simulator=self.simulator, sources=verilog_sources)))
+
+        start = time.perf_counter()
+        try:
+            return cocotb_test.simulator.run(work_dir=work_dir, **run_args)
+        finally:
+            self.record(dict(
+                toplevel=toplevel,
+                key=key,
+                parameters=parameters,
+                hit=hit,
+                compile=compile_time,
+                simulation=time.perf_counter() - start
+            ))
+
+    def record(self, entry):
+        # single short appends, safe enough with concurrent workers
+        with open(self.timings_file, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def summarize(timings_file):
+    entries = []
+    with open(timings_file, 'r') as f:
+        for line in f:
+            entries.append(json.loads(line))
+
+    compile_time = sum(e["compile"] for e in entries)
+    simulation_time = sum(e["simulation"] for e in entries)
+    hits = sum(1 for e in entries if e["hit"])
+    total = compile_time + simulation_time
+
+    print(f"{len(entries)} runs, {hits} build cache hits, {len(entries) - hits} compiles")
+    if total:
+        print(f"compile:    {compile_time:10.2f} s ({100*compile_time/total:5.1f} %)")
+        print(f"simulation: {simulation_time:10.2f} s ({100*simulation_time/total:5.1f} %)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('timings', type=str, nargs='?',
+                        default=os.path.join(default_cache_dir(os.path.dirname(os.path.abspath(__file__))), "timings.jsonl"),
+                        help="timings file written by the build cache")
+
+    args = parser.parse_args()
+
+    summarize(args.timings)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Sparse page-backed memory for the cocotbext-axi RAM models
+"""
+
+import os
+import mmap
+
+
+class Guard(object):
+    """Guard bands below and above a region, and the writes that hit them."""
+    __slots__ = ("start", "stop", "margin", "violations")
+
+    def __init__(self, start, stop, margin):
+        self.start = start
+        self.stop = stop
+        self.margin = margin
+        self.violations = []
+
+    def hit(self, address, length):
+        end = address + length
+        return (address < self.start and end > self.start - self.margin) or (end > self.stop and address < self.stop + self.margin)
+
+
+class PagedMemory(object):
+    """
+    Memory object for the mem argument of AxiRam and the other cocotbext-axi Memory based models,
+    e.g. AxiRam(bus, clk, rst, mem=PagedMemory(2**32)).
+
+    Only pages that are written are allocated, reads of untouched pages return zeros without allocating
+    them. With backing, the memory is a sparse file of the full size mapped into the address space, so
+    the operating system allocates the touched pages and the contents outlive the simulation.
+
+    guard() arms guard bands around a region; every write overlapping a band is recorded instead of
+    pre-filling the bands with a pattern and reading them back afterwards.
+    """
+    def __init__(self, size=2**32, page_size=4096, backing=None):
+        if page_size & (page_size - 1):
+            raise ValueError("page size must be a power of two")
+
+        self.size = size
+        self.page_size = page_size
+        self.page_mask = page_size - 1
+        self.pages = {}
+        self.guards = []
+
+        self.file = None
+        self.map = None
+        if backing:
+            self.file = open(backing, 'a+b')
+            if os.path.getsize(backing) < size:
+                self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = None
+            self.file = None
+
+    def read(self, address, length):
+        if address < 0 or length < 0 or address + length > self.size:
+            raise ValueError("operation out of range")
+
+        if self.map is not None:
+            return self.map[address:address+length]
+
+        offset = address & self.page_mask
+        if offset + length <= self.page_size:
+            # within one page
+            page = self.pages.get(address - offset)
+            return bytes(page[offset:offset+length]) if page is not None else bytes(length)
+
+        data = bytearray(length)
+        view = memoryview(data)
+        pos = 0
+        while pos < length:
+            offset = address & self.page_mask
+            n = min(self.page_size - offset, length - pos)
+            page = self.pages.get(address - offset)
+            if page is not None:
+                view[pos:pos+n] = page[offset:offset+n]
+            address += n
+            pos += n
+        return bytes(data)
+
+    def write(self, address, data):
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        length = len(data)
+        if address < 0 or address + length > self.size:
+            raise ValueError("operation out of range")
+
+        if self.guards:
+            for guard in self.guards:
+                if guard.hit(address, length):
+                    guard.violations.append((address, length))
+
+        if self.map is not None:
+            self.map[address:address+length] = data
+            return
+
+        offset = address & self.page_mask
+        if offset + length <= self.page_size:
+            page = self.pages.get(address - offset)
+            if page is None:
+                page = self.pages[address - offset] = bytearray(self.page_size)
+            page[offset:offset+length] = data
+            return
+
+        view = memoryview(data)
+        pos = 0
+        while pos < length:
+            offset = address & self.page_mask
+            n = min(self.page_size - offset, length - pos)
+            page = self.pages.get(address - offset)
+            if page is None:
+                page = self.pages[address - offset] = bytearray(self.page_size)
+            page[offset:offset+n] = view[pos:pos+n]
+            address += n
+            pos += n
+
+    def fill(self, address, length, value=0):
+        self.write(address, bytes([value]) * length)
+
+    def clear(self):
+        self.pages.clear()
+
+    def guard(self, address, length, margin=128, fill=0xaa):
+        """Fill the region with fill and arm guard bands of margin bytes on both sides of it."""
+        self.fill(address, length, fill)
+        guard = Guard(address, address + length, margin)
+        self.guards.append(guard)
+        return guard
+
+    def unguard(self, guard):
+        """Disarm a guard, returns the (address, length) of the writes that hit its bands."""
+        self.guards.remove(guard)
+        return guard.violations
+
+    @property
+    def footprint(self):
+        if self.map is not None:
+            return os.fstat(self.file.fileno()).st_blocks * 512
+        return len(self.pages) * self.page_size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self.read(key, 1)[0]
+        elif isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step == 1:
+                return self.read(start, stop-start)
+        raise IndexError("specified step size is not supported")
+
+    def __setitem__(self, key, value):
+        if isinstance(key, int):
+            self.write(key, bytes([value]))
+        elif isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step == 1:
+                if stop-start != len(value):
+                    raise IndexError("slice assignment is wrong size")
+                return self.write(start, value)
+            raise IndexError("specified step size is not supported")
@@ -0,0 +1,178 @@
+"""
+Precomputed pause patterns for the cocotbext-axi channel pause inputs (idle and backpressure insertion)
+"""
+
+import os
+
+import numpy as np
+
+import cocotb
+
+import tbutils
+
+
+# Patterns generate the pause bits of cycles start..start+length-1 of every channel as a bool array
+# (channels, length), given the bits of the cycle before (state). Random draws come from rng, which
+# belongs to the driver, so one pattern object can be shared by several drivers.
+
+class Bernoulli(object):
+    """Every cycle is a pause with probability p."""
+    def __init__(self, p=0.5):
+        self.p = p
+
+    def generate(self, rng, channels, start, length, state):
+        return rng.random((channels, length)) < self.p
+
+    def __repr__(self):
+        return f"Bernoulli({self.p})"
+
+
+class Markov(object):
+    """
+    Bursty on/off pattern: runs of activity and pauses with geometric lengths, mean run cycles of
+    activity and mean pause cycles of pausing.
+    """
+    def __init__(self, run=16, pause=4):
+        self.run = run
+        self.pause = pause
+
+    def generate(self, rng, channels, start, length, state):
+        out = np.empty((channels, length), dtype=bool)
+        # runs are memoryless, a block starts a new run in the state the previous block ended in
+        count = 2 * int(length / (self.run + self.pause)) + 16
+        for ch in range(channels):
+            pos = 0
+            paused = bool(state[ch])
+            while pos < length:
+                runs = np.empty(count, dtype=np.int64)
+                runs[0::2] = rng.geometric(1 / self.pause if paused else 1 / self.run, (count + 1) // 2)
+                runs[1::2] = rng.geometric(1 / self.run if paused else 1 / self.pause, count // 2)
+                values = np.resize(np.array([paused, not paused]), count)
+                run_bits = np.repeat(values, runs)[:length-pos]
+                out[ch, pos:pos+len(run_bits)] = run_bits
+                pos += len(run_bits)
+                paused = bool(run_bits[-1])
+        return out
+
+    def __repr__(self):
+        return f"Markov(run={self.run}, pause={self.pause})"
+
+
+class DutyCycle(object):
+    """Pause for the first pause cycles of every period, phase (per channel if a sequence) shifts the pattern."""
+    def __init__(self, period=4, pause=3, phase=0):
+        self.period = period
+        self.pause = pause
+        self.phase = phase
+
+    def generate(self, rng, channels, start, length, state):
+        phase = np.resize(np.asarray(self.phase, dtype=np.int64), channels)[:, None]
+        t = np.arange(start, start + length)
+        return (t + phase) % self.period < self.pause
+
+    def __repr__(self):
+        return f"DutyCycle(period={self.period}, pause={self.pause}, phase={self.phase})"
+
+
+class Trace(object):
+    """
+    Recorded pause bits, repeated: a sequence of 0/1, a string like "1110" or the path of a .npy file
+    or of a text file of 0/1 characters. Rows of a 2D array are assigned to the channels in turn.
+    """
+    def __init__(self, source):
+        if isinstance(source, str) and os.path.exists(source):
+            if source.endswith(".npy"):
+                bits = np.load(source)
+            else:
+                with open(source, 'r') as f:
+                    bits = [int(c) for c in f.read() if c in "01"]
+        elif isinstance(source, str):
+            bits = [int(c) for c in source if c in "01"]
+        else:
+            bits = source
+        self.bits = np.atleast_2d(np.asarray(bits, dtype=bool))
+        if not self.bits.size:
+            raise ValueError("empty pause trace")
+        if isinstance(source, str) and (os.path.exists(source) or len(source) <= 32):
+            self.source = source
+        else:
+            self.source = f"<{self.bits.shape[1]} cycles>"
+
+    def generate(self, rng, channels, start, length, state):
+        rows = self.bits[np.arange(channels) % len(self.bits)]
+        return rows[:, np.arange(start, start + length) % rows.shape[1]]
+
+    def __repr__(self):
+        return f"Trace({self.source!r})"
+
+
+# the former cycle_pause(), active one cycle out of four
+CYCLE_PAUSE = DutyCycle(period=4, pause=3)
+
+PATTERNS = dict(
+    cycle=CYCLE_PAUSE,
+    bernoulli=Bernoulli(0.3),
+    bursty=Markov(run=32, pause=8)
+)
+
+
+def named_patterns(names):
+    """Patterns for a comma separated list of PATTERNS keys, "none" for no pauses."""
+    return [None if name == "none" else PATTERNS[name] for name in names.split(",")]
+
+
+class PauseDriver(object):
+    """
+    Drives the pause of a set of cocotbext-axi channels (anything with a pause attribute) from one
+    pattern, in place of one pause generator coroutine per channel. The pattern is generated for block
+    cycles of all channels at once, and a single coroutine sleeps until the next cycle in which any
+    channel changes.
+    """
+    def __init__(self, clock, channels, pattern, seed=None, block=4096):
+        self.clock = clock
+        self.channels = list(channels)
+        self.pattern = pattern
+        self.rng = np.random.default_rng(seed)
+        self.block = block
+        self.cycles = 0
+        self.wakeups = 0
+        self._cr = None
+
+    def start(self):
+        if self._cr is None:
+            self._cr = cocotb.start_soon(self._run())
+
+    def stop(self):
+        if self._cr is not None:
+            self._cr.kill()
+            self._cr = None
+        for channel in self.channels:
+            channel.pause = False
+
+    async def _run(self):
+        channels = self.channels
+        state = np.zeros(len(channels), dtype=bool)
+        for channel in channels:
+            channel.pause = False
+
+        # pending cycles to the first change of the next block
+        wait = 0
+        while True:
+            bits = self.pattern.generate(self.rng, len(channels), self.cycles, self.block, state)
+            change = bits != np.concatenate((state[:, None], bits[:, :-1]), axis=1)
+            # every change as (cycle, channel, value), in cycle order
+            times, chs = np.nonzero(change.T)
+            values = bits[chs, times]
+
+            last = 0
+            for t, ch, value in zip(times.tolist(), chs.tolist(), values.tolist()):
+                if t != last or wait:
+                    await tbutils.wait_cycles(self.clock, wait + t - last)
+                    self.wakeups += 1
+                    wait = 0
+                    last = t
+                channels[ch].pause = value
+
+            wait += self.block - last
+            self.cycles += self.block
+            state = bits[:, -1].copy()
@@ -1,17 +1,21 @@
 import cocotb
 from cocotb.triggers import Timer
 
-import cocotb_test.simulator
 import pytest
 import os
+import sys
 import subprocess
 import logging
 
-from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, FallingEdge, Timer
 from cocotb.regression import TestFactory
 
-from numpy.random import randint
+import numpy as np
+
+from arbiter_model import ArbiterModel
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import tbutils
 
 class TB(object):
     def __init__(self, dut):
@@ -23,101 +27,123 @@ class TB(object):
         self.lsb_priority = dut.ARB_LSB_HIGH_PRIORITY.value
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
+        tbutils.capture(self.log)
+
+        self.model = ArbiterModel(self.ports, self.round_robin, self.block, self.block_ack, self.lsb_priority)
+        self.rng = np.random.default_rng(cocotb.RANDOM_SEED)
 
-        cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+        tbutils.start_clock(dut.clk, 10, units="ns")
 
     async def cycle_reset(self):
-        self.dut.resetn.setimmediatevalue(1)
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
-        self.dut.resetn.value = 0
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
-        self.dut.resetn.value = 1
+        await tbutils.reset(self.dut.clk, self.dut.resetn, active_level=False)
 
-    def generate_request(self):
-        request = randint(0, 2**self.ports)
-        return request
+    def generate_vectors(self, cycles, density=0.5):
+        # every port requests (acknowledges) with probability density in every cycle
+        bits = self.rng.random((cycles, self.ports)) < density
+        return (bits * self.model.onehot).sum(axis=1, dtype=np.uint64)
 
-    def request_putdown(self, request, n):
-        remainder = request % 2**n
-        main_part = int(request / 2**(n+1)) << (n + 1)
+    def sample(self):
+        return int(self.dut.grant.value), int(self.dut.grant_valid.value), int(self.dut.grant_encoded.value)
 
-        return main_part + remainder
+    def check(self, t, request, acknowledge, actual, expected):
+        assert actual == expected, f"Error: cycle {t}, request {request:#x}, acknowledge {acknowledge:#x}: " \
+            f"expected grant {expected[0]:#x}, grant_valid {expected[1]}, grant_encoded {expected[2]}, " \
+            f"got grant {actual[0]:#x}, grant_valid {actual[1]}, grant_encoded {actual[2]}"
 
-    def generate_grants(self, request):
-        grants = list()
-        i = 0
-        while request > 0:
-            bit = request % 2
-            request = int(request / 2)
 
-            if bit > 0:
-                grants.append(i)
+async def run_test_random(dut, density=0.5):
+    tb = TB(dut)
 
-            i += 1
+    cycles = int(os.environ.get("ARBITER_CYCLES", 10000))
 
-        return grants
+    # reset inputs
+    tb.dut.request.value = 0
+    tb.dut.acknowledge.value = 0
+
+    await tb.cycle_reset()
 
-    def generate_acknowledge(self, n):
-        return 2**n
+    # arbitrary request and acknowledge vectors, expected outputs precomputed for the whole run
+    requests = tb.generate_vectors(cycles, density)
+    acknowledges = tb.generate_vectors(cycles, density)
+    expected = np.column_stack([x.astype(np.int64) for x in tb.model.run(requests, acknowledges)])
 
+    # inputs change on the falling edge, outputs of the previous rising edge are sampled there too
+    actual = np.zeros((cycles, 3), dtype=np.int64)
+    await FallingEdge(dut.clk)
 
-async def run_test_arbitration(dut):
+    for t in range(cycles):
+        tb.dut.request.value = int(requests[t])
+        tb.dut.acknowledge.value = int(acknowledges[t])
+        await FallingEdge(dut.clk)
+        actual[t] = tb.sample()
+
+    mismatch = np.flatnonzero((actual != expected).any(axis=1))
+    tb.log.info("%d cycles, %d mismatches", cycles, len(mismatch))
+    if len(mismatch):
+        t = mismatch[0]
+        tb.check(t, int(requests[t]), int(acknowledges[t]), tuple(actual[t]), tuple(expected[t]))
+
+    await tbutils.wait_cycles(dut.clk, 2)
+
+
+async def run_test_arbitration(dut, density=0.2):
     tb = TB(dut)
 
+    cycles = int(os.environ.get("ARBITER_CYCLES", 10000)) // 10
+
     # reset inputs
     tb.dut.request.value = 0
     tb.dut.acknowledge.value = 0
 
     await tb.cycle_reset()
 
-    # generate requests
-    requests = [tb.generate_request() for i in range(10)]
+    # requesters hold their request until it is granted, then acknowledge the grant and drop it
+    new_requests = tb.generate_vectors(cycles, density)
+    request = 0
+    grants = [0] * tb.ports
 
-    for j in range(len(requests)):
-        request = requests[j]
-        grants = tb.generate_grants(request)
+    await FallingEdge(dut.clk)
 
-        i = 0
-        tb.dut.request.value = request
-        while request > 0:
-            await RisingEdge(dut.clk)
-            tb.dut.acknowledge.value = 0
-            await RisingEdge(dut.clk)
+    for t in range(cycles):
+        # only drives the acknowledge, tb.check compares all three outputs below
+        grant, grant_valid, _ = tb.sample()
+        acknowledge = grant if grant_valid else 0
+        request = (request & ~acknowledge) | int(new_requests[t])
 
-            while tb.dut.grant_valid.value != 1:
-                await RisingEdge(dut.clk)
+        tb.dut.request.value = request
+        tb.dut.acknowledge.value = acknowledge
 
-            assert tb.dut.grant_encoded.value in grants, f"Error: expected grant on request {grants[i]}, got {tb.dut.grant_encoded.value} instead. Request: {tb.dut.request.value}, iteration: {i}"
+        expected = tuple(int(x) for x in tb.model.step(request, acknowledge))
+        await FallingEdge(dut.clk)
 
-            # generate acknowledge
-            tb.dut.acknowledge.value = tb.generate_acknowledge(grants[i])
+        actual = tb.sample()
+        tb.check(t, request, acknowledge, actual, expected)
 
-            # Deassert request bit
-            request = tb.request_putdown(request, grants[i])
-            tb.dut.request.value = request
+        if actual[1]:
+            grants[actual[2]] += 1
 
-            i += 1
-            await RisingEdge(dut.clk)
+    tb.log.info("grants per port: %s", grants)
 
-    await RisingEdge(dut.clk)
-    await RisingEdge(dut.clk)
+    await tbutils.wait_cycles(dut.clk, 2)
 
 
 if cocotb.SIM_NAME:
-    factory = TestFactory(run_test_arbitration)
-    factory.generate_tests()
+    for test in [run_test_random, run_test_arbitration]:
+        factory = TestFactory(test)
+        factory.add_option("density", [0.1, 0.5, 0.9])
+        factory.generate_tests()
 
 # cocotb-test
 tests_dir = os.path.abspath(os.path.dirname(__file__))
 rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
 
-def test_arbiter():
+@pytest.mark.parametrize("round_robin", [0, 1])
+@pytest.mark.parametrize("block", [0, 1])
+@pytest.mark.parametrize("block_ack", [0, 1])
+@pytest.mark.parametrize("lsb_priority", [0, 1])
+def test_arbiter(round_robin, block, block_ack, lsb_priority):
     dut = "arbiter"
     testbench = f"test_{dut}"
-    module = os.path.splitext(os.path.basename(__file__))[0]
     toplevel = testbench
 
     test_file = os.path.join(tests_dir, f"{testbench}.sv")
@@ -128,13 +154,15 @@ def test_arbiter():
         os.path.join(rtl_dir, f"{dut}.sv")
     ]
 
-    sim_build = os.path.join(tests_dir, "sim_build", f"{dut}")
-
-    cocotb_test.simulator.run(
-        python_search=[tests_dir],
-        verilog_sources=verilog_sources,
-        toplevel=toplevel,
-        module=module,
-        sim_build=sim_build,
-        timescale='1ns/1ps'
+    parameters = {
+        "ARB_TYPE_ROUND_ROBIN": round_robin,
+        "ARB_BLOCK": block,
+        "ARB_BLOCK_ACK": block_ack,
+        "ARB_LSB_HIGH_PRIORITY": lsb_priority
+    }
+
+    tbutils.run(
+        __file__, toplevel, verilog_sources,
+        parameters=parameters,
+        sim_build=f"{dut}_{round_robin}{block}{block_ack}{lsb_priority}"
     )
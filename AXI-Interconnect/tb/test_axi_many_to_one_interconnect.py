@@ -1,20 +1,31 @@
 import pytest
 import os
-import subprocess
+import sys
 import logging
-import itertools
+import ast
 
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, FallingEdge, Timer
+from cocotb.triggers import RisingEdge, Timer
 from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
 
-import cocotb_test.simulator
-
-from cocotbext.axi import AxiBus, AxiMaster, AxiRam
+from cocotbext.axi import AxiMaster, AxiRam
+from cocotbext.axi.utils import hexdump_str
 
 from numpy.random import randint
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import tbutils
+
+from wrapper_cache import WrapperCache
+from build_cache import BuildCache, default_cache_dir
+from axi_bus_binding import axi_bus, axi_slave_buses
+from axi_scoreboard import InterconnectScoreboard
+from paged_memory import PagedMemory
+from axi_traffic import TrafficGenerator
+from axi_trace import AxiTrace, AxiTraceRecorder, replay, write_image
+from pause_patterns import PauseDriver, named_patterns
+
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
@@ -26,41 +37,72 @@ class TB(object):
         self.user_width = dut.C_USER_WIDTH.value
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
-
-        cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
 
-        self.axi_masters = [AxiMaster(AxiBus.from_prefix(dut, f"s{k:02d}_axi"), dut.clk, dut.resetn, reset_active_level=False) for k in range(self.s_count)]
-        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.resetn, reset_active_level=False, size=2**32)
-
-        self.axi_ram.write_if.log.setLevel(logging.DEBUG)
+        tbutils.start_clock(dut.clk, 10, units="ns")
+
+        self.s_buses = axi_slave_buses(dut, self.s_count)
+        self.m_bus = axi_bus(dut, "m_axi")
+
+        self.axi_masters = [AxiMaster(bus, dut.clk, dut.resetn, reset_active_level=False) for bus in self.s_buses]
+        # only touched pages are allocated, AXI_RAM_FILE=<path> maps the memory onto a sparse file instead
+        self.mem = PagedMemory(2**self.addr_width, backing=os.environ.get("AXI_RAM_FILE"))
+        self.axi_ram = AxiRam(self.m_bus, dut.clk, dut.resetn, reset_active_level=False, mem=self.mem)
+
+        # kept in a ring buffer and only written out when the test fails, see tbutils/deferred_log.py
+        tbutils.capture(self.log, self.axi_ram.write_if.log, self.axi_ram.read_if.log,
+                        *(log for m in self.axi_masters for log in (m.write_if.log, m.read_if.log)))
+
+        # passive check of transaction ownership, ID grouping and response routing, SCOREBOARD=0 disables it
+        self.scoreboard = None
+        if int(os.environ.get("SCOREBOARD", 1)):
+            self.scoreboard = InterconnectScoreboard(dut.clk, self.m_bus, self.s_buses, dut.C_ID_MT_USE.value, self.log)
+
+        # waveform window in absolute sim time, "start:stop" in ns (wrapper must be generated with a window)
+        waves_window = os.environ.get("WAVES_WINDOW")
+        if waves_window and hasattr(dut, "waves_en"):
+            start, stop = (float(t) for t in waves_window.split(":"))
+            if stop > get_sim_time('ns'):
+                cocotb.start_soon(self.waves_window(start, stop))
+
+    def set_waves(self, enable):
+        # arm/disarm waveform dumping, no-op unless the wrapper was generated with a window
+        if hasattr(self.dut, "waves_en"):
+            self.dut.waves_en.value = int(enable)
+
+    async def waves_window(self, start, stop):
+        now = get_sim_time('ns')
+        if start > now:
+            await Timer(start - now, 'ns')
+        self.set_waves(True)
+        await Timer(stop - max(start, now), 'ns')
+        self.set_waves(False)
+
+    def check_scoreboard(self):
+        if self.scoreboard:
+            self.scoreboard.check()
 
     async def cycle_reset(self):
-        self.dut.resetn.setimmediatevalue(1)
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
-        self.dut.resetn.value = 0
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
-        self.dut.resetn.value = 1
-
-    def set_idle_generator(self, generator=None):
-        if generator:
+        await tbutils.reset(self.dut.clk, self.dut.resetn, active_level=False)
+
+    def set_idle_pattern(self, pattern=None):
+        # one driver for the valid side of every channel, see pause_patterns.py
+        if pattern:
+            channels = []
             for master in self.axi_masters:
-                master.write_if.aw_channel.set_pause_generator(generator())
-                master.write_if.w_channel.set_pause_generator(generator())
-                master.read_if.ar_channel.set_pause_generator(generator())
-            self.axi_ram.write_if.b_channel.set_pause_generator(generator())
-            self.axi_ram.read_if.r_channel.set_pause_generator(generator())
-
-    def set_backpressure_generator(self, generator=None):
-        if generator:
+                channels += [master.write_if.aw_channel, master.write_if.w_channel, master.read_if.ar_channel]
+            channels += [self.axi_ram.write_if.b_channel, self.axi_ram.read_if.r_channel]
+            self.idle_driver = PauseDriver(self.dut.clk, channels, pattern, seed=cocotb.RANDOM_SEED + 1)
+            self.idle_driver.start()
+
+    def set_backpressure_pattern(self, pattern=None):
+        # one driver for the ready side of every channel
+        if pattern:
+            channels = []
             for master in self.axi_masters:
-                master.write_if.b_channel.set_pause_generator(generator())
-                master.read_if.r_channel.set_pause_generator(generator())
-            self.axi_ram.write_if.aw_channel.set_pause_generator(generator())
-            self.axi_ram.write_if.w_channel.set_pause_generator(generator())
-            self.axi_ram.read_if.ar_channel.set_pause_generator(generator())
+                channels += [master.write_if.b_channel, master.read_if.r_channel]
+            channels += [self.axi_ram.write_if.aw_channel, self.axi_ram.write_if.w_channel, self.axi_ram.read_if.ar_channel]
+            self.backpressure_driver = PauseDriver(self.dut.clk, channels, pattern, seed=cocotb.RANDOM_SEED + 2)
+            self.backpressure_driver.start()
 
 
 async def run_test_write(dut, s=0, idle_inserter=None, backpressure_inserter=None):
@@ -73,8 +115,8 @@ async def run_test_write(dut, s=0, idle_inserter=None, backpressure_inserter=Non
 
     await tb.cycle_reset()
 
-    tb.set_idle_generator(idle_inserter)
-    tb.set_backpressure_generator(backpressure_inserter)
+    tb.set_idle_pattern(idle_inserter)
+    tb.set_backpressure_pattern(backpressure_inserter)
 
     for length in list(range(1, byte_lanes*2))+[1024]:
         for offset in list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096)):
@@ -83,18 +125,22 @@ async def run_test_write(dut, s=0, idle_inserter=None, backpressure_inserter=Non
             addr = offset+0x1000
             test_data = bytearray([x % 256 for x in range(length)])
 
-            tb.axi_ram.write(addr-128, b'\xaa'*(length+256))
+            guard = tb.mem.guard(addr, length)
 
             await tb.axi_masters[s].write(addr, test_data, size=size)
 
-            tb.log.debug("%s", tb.axi_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
+            if tb.log.isEnabledFor(logging.DEBUG):
+                # snapshot now, rendered only if the test fails
+                start = (addr & ~0xf)-16
+                dump_length = (((addr & 0xf)+length-1) & ~0xf)+48
+                tb.log.debug("%s", tbutils.Lazy(hexdump_str, tb.mem.read(start, dump_length), 0, dump_length, 16, "", start))
 
             assert tb.axi_ram.read(addr, length) == test_data # data arrived at destination
-            assert tb.axi_ram.read(addr-1, 1) == b'\xaa' # no lower addresses were hurt
-            assert tb.axi_ram.read(addr+length, 1) == b'\xaa' # no higher addresses were hurt
+            assert not tb.mem.unguard(guard) # no lower or higher addresses were hurt
 
-    await RisingEdge(dut.clk)
-    await RisingEdge(dut.clk)
+    await tbutils.wait_cycles(dut.clk, 2)
+
+    tb.check_scoreboard()
 
 
 async def run_test_read(dut, s=0, idle_inserter=None, backpressure_inserter=None):
@@ -107,8 +153,8 @@ async def run_test_read(dut, s=0, idle_inserter=None, backpressure_inserter=None
 
     await tb.cycle_reset()
 
-    tb.set_idle_generator(idle_inserter)
-    tb.set_backpressure_generator(backpressure_inserter)
+    tb.set_idle_pattern(idle_inserter)
+    tb.set_backpressure_pattern(backpressure_inserter)
 
     for length in list(range(1, byte_lanes*2))+[1024]:
         for offset in list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096)):
@@ -123,8 +169,9 @@ async def run_test_read(dut, s=0, idle_inserter=None, backpressure_inserter=None
 
             assert data.data == test_data
 
-    await RisingEdge(dut.clk)
-    await RisingEdge(dut.clk)
+    await tbutils.wait_cycles(dut.clk, 2)
+
+    tb.check_scoreboard()
 
 
 async def run_test_read_write(dut, idle_inserter=None, backpressure_inserter=None):
@@ -132,109 +179,116 @@ async def run_test_read_write(dut, idle_inserter=None, backpressure_inserter=Non
 
     await tb.cycle_reset()
 
-    tb.set_idle_generator(idle_inserter)
-    tb.set_backpressure_generator(backpressure_inserter)
+    tb.set_idle_pattern(idle_inserter)
+    tb.set_backpressure_pattern(backpressure_inserter)
 
-    async def run_read(master, ram, offset, aperture, count=16):
-        for i in range(count):
-            length = randint(1, min(512, aperture))
-            addr = offset + randint(0, aperture-length)
+    # 16 concurrent read and write streams spread over the masters, 16 transactions each
+    streams = max(1, 16 // tb.s_count)
+    spec = dict(count=16*streams, outstanding=streams, aperture=0x1000*streams, length=(1, 512))
 
-            test_data = bytearray([x % 256 for x in range(length)])
-
-            ram.write(addr, test_data)
+    await TrafficGenerator(tb.axi_masters, dut.clk, tb.axi_ram, spec, seed=cocotb.RANDOM_SEED, log=tb.log).run()
 
-            data = await master.read(addr, length)
+    await tbutils.wait_cycles(dut.clk, 2)
 
-            assert data.data == test_data
+    tb.check_scoreboard()
 
-    async def run_write(master, ram, offset, aperture, count=16):
-        for i in range(count):
-            length = randint(1, min(512, aperture))
-            addr = offset + randint(0, aperture-length)
 
-            test_data = bytearray([x % 256 for x in range(length)])
+async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
+    tb = TB(dut)
 
-            ram.write(addr-128, b'\xaa'*(length+256))
+    await tb.cycle_reset()
 
-            await master.write(addr, test_data)
+    tb.set_idle_pattern(idle_inserter)
+    tb.set_backpressure_pattern(backpressure_inserter)
 
-            assert ram.read(addr, length) == test_data
-            assert ram.read(addr-1, 1) == b'\xaa'
-            assert ram.read(addr+length, 1) == b'\xaa'
+    # 16 concurrent streams of writes and reads with idle gaps, spread over the masters;
+    # TRAFFIC_SPEC overrides entries of the spec, e.g. TRAFFIC_SPEC="{'count': 1024, 'pattern': 'hotspot'}"
+    streams = max(1, 16 // tb.s_count)
+    spec = dict(count=32*streams, outstanding=streams, aperture=0x1000*streams, length=(1, 512), rate=0.2)
+    spec.update(ast.literal_eval(os.environ.get("TRAFFIC_SPEC", "{}")))
 
-    workers = []
+    await TrafficGenerator(tb.axi_masters, dut.clk, tb.axi_ram, spec, seed=cocotb.RANDOM_SEED, log=tb.log).run()
 
-    for k in range(8):
-        workers.append(cocotb.start_soon(run_read(tb.axi_masters[k % len(tb.axi_masters)], tb.axi_ram, k*0x1000, 0x1000)))
-        workers.append(cocotb.start_soon(run_write(tb.axi_masters[k % len(tb.axi_masters)], tb.axi_ram, 0x10000 + k*0x1000, 0x1000)))
+    await tbutils.wait_cycles(dut.clk, 2)
 
-    while workers:
-        await workers.pop(0).join()
+    tb.check_scoreboard()
 
-    await RisingEdge(dut.clk)
-    await RisingEdge(dut.clk)
 
 
-async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
+async def run_test_trace(dut):
     tb = TB(dut)
 
     await tb.cycle_reset()
 
-    tb.set_idle_generator(idle_inserter)
-    tb.set_backpressure_generator(backpressure_inserter)
-
-    async def worker(master, ram, offset, aperture, count=16):
-        for k in range(count):
-            length = randint(1, min(512, aperture))
-            addr = offset + randint(0, aperture-length)
-            test_data = bytearray([x % 256 for x in range(length)])
+    # TRACE_REPLAY=<trace dir> replays a recorded trace, TRACE_TIMING=fast ignores its timestamps
+    path = os.environ.get("TRACE_REPLAY")
+    timing = os.environ.get("TRACE_TIMING", "original")
 
-            await Timer(randint(1, 100), 'ns')
+    if not path:
+        # record generated traffic on every port, then replay the slave interface side of it
+        path = os.path.abspath(f"trace_{tb.s_count}_{tb.data_width}_{dut.C_ID_MT_USE.value}")
+        ports = dict(enumerate(tb.s_buses))
+        ports[-1] = tb.m_bus
+        recorder = AxiTraceRecorder(path, ports, dut.clk, s_count=tb.s_count, data_width=tb.data_width)
 
-            await master.write(addr, test_data)
+        stats = await TrafficGenerator(tb.axi_masters, dut.clk, tb.axi_ram, dict(count=64), seed=cocotb.RANDOM_SEED).run()
+        await RisingEdge(dut.clk)
+        recorder.close()
 
-            await Timer(randint(1, 100), 'ns')
+        # every burst is seen once on its slave interface and once on m_axi
+        trace = AxiTrace(path)
+        assert (trace.aw["port"] < 0).sum() == (trace.aw["port"] >= 0).sum() >= sum(s["writes"] for s in stats)
+        assert (trace.ar["port"] < 0).sum() == (trace.ar["port"] >= 0).sum() >= sum(s["reads"] for s in stats)
+        assert len(trace.data) == 2 * sum(s["write_bytes"] for s in stats)
 
-            data = await master.read(addr, length)
-            assert data.data == test_data
+    # the recorded run left the written data in memory, invert it so the replay has to write it again
+    trace = AxiTrace(path)
+    image = write_image(trace)
+    for addr, data in image:
+        tb.mem.write(addr, bytes(b ^ 0xff for b in data))
 
-    workers = []
+    tb.log.info("Replaying %s", path)
+    count = await replay(trace, tb.axi_masters, timing, log=tb.log)
+    tb.log.info("%d transactions replayed", count)
 
-    for k in range(16):
-        workers.append(cocotb.start_soon(worker(tb.axi_masters[k % len(tb.axi_masters)], tb.axi_ram, k*0x1000, 0x1000, count=16)))
+    await tbutils.wait_cycles(dut.clk, 2)
 
-    while workers:
-        await workers.pop(0).join()
+    for addr, data in image:
+        actual = tb.mem.read(addr, len(data))
+        if actual != data:
+            k = next(k for k in range(len(data)) if actual[k] != data[k])
+            assert False, f"replayed writes left {actual[k]:#04x} at {addr+k:#x}, recorded {data[k]:#04x}"
 
-    await RisingEdge(dut.clk)
-    await RisingEdge(dut.clk)
+    tb.check_scoreboard()
 
 
-
-def cycle_pause():
-    return itertools.cycle([1, 1, 1, 0])
-
 if cocotb.SIM_NAME:
+    # pause patterns of the idle/backpressure variants, PAUSE_PATTERNS=cycle,bernoulli,bursty adds more
+    pause_patterns = [None] + named_patterns(os.environ.get("PAUSE_PATTERNS", "cycle"))
+
     #s_count = len(cocotb.top.axi_many_to_one_interconnect_inst.s_axi_awvalid)
     # separate reads and writes
     #for test in [run_test_write, run_test_read]:
         #factory = TestFactory(test)
         #factory.add_option("s", range(min(s_count, 2)))
-        #factory.add_option("idle_inserter", [None, cycle_pause])
-        #factory.add_option("backpressure_inserter", [None, cycle_pause])
+        #factory.add_option("idle_inserter", pause_patterns)
+        #factory.add_option("backpressure_inserter", pause_patterns)
         #factory.generate_tests()
 
-    # stress test - separate reads and writes
+    # stress test - concurrent streams of mixed reads and writes from the traffic generator
     factory = TestFactory(run_stress_test)
-    factory.add_option("idle_inserter", [None, cycle_pause])
-    factory.add_option("backpressure_inserter", [None, cycle_pause])
+    factory.add_option("idle_inserter", pause_patterns)
+    factory.add_option("backpressure_inserter", pause_patterns)
     factory.generate_tests()
 
     # simultaneous reads and writes
     factory = TestFactory(run_test_read_write)
-    factory.add_option("idle_inserter", [None, cycle_pause])
-    factory.add_option("backpressure_inserter", [None, cycle_pause])
+    factory.add_option("idle_inserter", pause_patterns)
+    factory.add_option("backpressure_inserter", pause_patterns)
+    factory.generate_tests()
+
+    # trace recording and replay
+    factory = TestFactory(run_test_trace)
     factory.generate_tests()
 
 # cocotb-test
@@ -242,23 +296,53 @@ tests_dir = os.path.abspath(os.path.dirname(__file__))
 wrappers_dir = os.path.abspath(os.path.join(tests_dir, 'wrappers'))
 rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
 
+# Waveform policy, no dumping by default:
+#   WAVES_FORMAT=vcd|fst  dump format
+#   WAVES_SCOPE=a,b       hierarchy to dump, relative to the wrapper (e.g. axi_many_to_one_interconnect_inst)
+#   WAVES_WINDOW=t0:t1    dump only between t0 and t1 ns of sim time, e.g. around a failure reported
+#                         by a previous run (rerun with the same RANDOM_SEED)
+def waves_options():
+    waves = os.environ.get("WAVES_FORMAT", "off")
+    scope = os.environ.get("WAVES_SCOPE")
+    window = os.environ.get("WAVES_WINDOW")
+
+    if waves == "off" and window:
+        waves = "vcd"
+
+    return dict(
+        waves=waves,
+        waves_scope=scope.split(",") if scope else None,
+        waves_window=bool(window)
+    )
+
 @pytest.mark.parametrize("s_count", [1, 4, 8])
 @pytest.mark.parametrize("data_width", [32, 128, 512])
 @pytest.mark.parametrize("id_use", [0, 1])
 def test_axi_many_to_one_interconnect(s_count, data_width, id_use):
     dut = "axi_many_to_one_interconnect"
-    wrapper = f"{dut}_wrap_{s_count}_{data_width}_{id_use}"
-    module = os.path.splitext(os.path.basename(__file__))[0]
-    toplevel = wrapper
-
-    # generate wrapper
-    wrapper_file = os.path.join(wrappers_dir, f"{wrapper}.sv")
-    if not os.path.exists(wrapper_file):
-        subprocess.Popen(
-            [os.path.join(rtl_dir, f"{dut}_wrap.py"), "-s", f"{s_count}", "-d", f"{data_width}", "-i", f"{id_use}"],
-            cwd=wrappers_dir,
-            shell=False
-        ).wait()
+
+    # WRAPPER_PORTS=array selects the unpacked array port style of the generator
+    waves = waves_options()
+    ports = os.environ.get("WRAPPER_PORTS", "flat")
+
+    wrapper_cache = WrapperCache(wrappers_dir, os.path.join(rtl_dir, f"{dut}_wrap.py"))
+    build_cache = BuildCache(default_cache_dir(tests_dir))
+
+    # generate wrapper (or reuse a cached one rendered from the same generator and parameters)
+    if build_cache.runtime_parameters:
+        # one wrapper and one compiled model per S_COUNT, the rest is overridden when loading the design
+        toplevel = f"{dut}_wrap_{s_count}"
+        wrapper_file = wrapper_cache.get(s_count, 32, 1, name=toplevel, ports=ports, **waves)
+        parameters = {"C_DATA_WIDTH": data_width, "C_ID_MT_USE": id_use}
+    else:
+        toplevel = f"{dut}_wrap_{s_count}_{data_width}_{id_use}"
+        wrapper_file = wrapper_cache.get(s_count, data_width, id_use, ports=ports, **waves)
+        parameters = {}
+
+    # Icarus writes VCD unless told otherwise
+    plus_args = []
+    if waves["waves"] == "fst" and build_cache.simulator == "icarus":
+        plus_args.append("-fst")
 
     verilog_sources = [
         wrapper_file,
@@ -267,14 +351,12 @@ def test_axi_many_to_one_interconnect(s_count, data_width, id_use):
         os.path.join(rtl_dir, "arbiter.sv")
     ]
 
-    sim_build = os.path.join(tests_dir, "sim_build", f"{dut}_{s_count}_{data_width}_{id_use}")
-
-    cocotb_test.simulator.run(
-        python_search=[tests_dir],
-        verilog_sources=verilog_sources,
-        toplevel=toplevel,
-        module = module,
-        sim_build=sim_build,
-        timescale='1ns/1ps'
+    # compiled models are shared between runs and parameter points with identical sources and flags,
+    # see build_cache.py for the compile vs simulation time summary
+    tbutils.run(
+        __file__, toplevel, verilog_sources,
+        runner=build_cache.run,
+        sim_build=f"{dut}_{s_count}_{data_width}_{id_use}",
+        parameters=parameters,
+        plus_args=plus_args
     )
-
@@ -0,0 +1,129 @@
+"""
+Content-addressed cache for generated AXI Many to One Interconnect wrappers
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import importlib.util
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock(object):
+    """Exclusive inter-process lock on a file, used to serialize cache misses between pytest workers."""
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.path, 'a+')
+        if fcntl:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        self.f.close()
+        self.f = None
+
+
+def atomic_write(path, data):
+    # write to a temporary file in the same directory and rename it over the target,
+    # so readers never see a partially written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_module(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class WrapperCache(object):
+    """
+    Wrappers are stored as <name>.<key>.sv, where key is a hash of the generator source
+    (template and signal table) plus the wrapper parameters. A changed generator yields new keys,
+    so stale wrappers are never reused. Wrappers are rendered in-process, no subprocess is spawned.
+    """
+    def __init__(self, cache_dir, generator_file):
+        self.cache_dir = cache_dir
+        self.generator_file = generator_file
+        self.manifest_file = os.path.join(cache_dir, "manifest.json")
+        self.lock_file = os.path.join(cache_dir, ".lock")
+
+        with open(generator_file, 'rb') as f:
+            self.generator_hash = hashlib.sha256(f.read()).hexdigest()
+
+        self._generator = None
+
+    @property
+    def generator(self):
+        if self._generator is None:
+            self._generator = load_module(self.generator_file)
+        return self._generator
+
+    def key(self, **params):
+        h = hashlib.sha256(self.generator_hash.encode())
+        h.update(json.dumps(params, sort_keys=True).encode())
+        return h.hexdigest()[:16]
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def get(self, s_count, data_width, id_use, name=None, **options):
+        if name is None:
+            name = f"axi_many_to_one_interconnect_wrap_{s_count}_{data_width}_{id_use}"
+
+        params = dict(s_count=s_count, data_width=data_width, id_use=id_use, name=name, **options)
+        key = self.key(**params)
+        path = os.path.join(self.cache_dir, f"{name}.{key}.sv")
+
+        # fast path: files only appear through an atomic rename, so existence means complete
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        with FileLock(self.lock_file):
+            # another worker may have generated it while we were waiting for the lock
+            if not os.path.exists(path):
+                atomic_write(path, self.generator.render(s_count, data_width, id_use, name=name, **options))
+
+                manifest = self.read_manifest()
+                manifest[key] = dict(
+                    name=name,
+                    file=os.path.basename(path),
+                    params=params,
+                    generator=self.generator_hash,
+                    created=time.time()
+                )
+                atomic_write(self.manifest_file, json.dumps(manifest, indent=4, sort_keys=True))
+
+        return path
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Frame throughput benchmark of gpc_axi_register over the AXI-Lite and AXI-Stream widths
+
+Every width point is simulated in three modes, each with frames queued back to back:
+  axis2axil   frames received on AXI-Stream and read over AXI-Lite (packet capture)
+  axil2axis   frames written over AXI-Lite and sent on AXI-Stream
+  roundtrip   every frame received, read, written back and sent before the next one
+Reported per mode: cycles per frame, frames/s at the given clock and, for round trips, the mean and
+worst latency of a frame in cycles. Widths the register does not support are reported as failed.
+"""
+
+import os
+import json
+import argparse
+import itertools
+import subprocess
+
+import numpy as np
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiStreamFrame
+
+from test_gpc_axi_register import TB, tbutils
+from gpc_register_driver import FRAME_SIZE
+
+MODES = ["axis2axil", "axil2axis", "roundtrip"]
+
+
+async def run_benchmark(dut, mode="axis2axil"):
+    tb = TB(dut)
+
+    count = int(os.environ.get("GPC_FRAMES", 256))
+    # frames/s is reported for a GPC_CLOCK_MHZ clock, whatever the period of the testbench clock
+    clock_mhz = float(os.environ.get("GPC_CLOCK_MHZ", 200))
+    period = tb.clock.period
+
+    await tb.reset()
+
+    frames = [bytearray(np.random.default_rng(cocotb.RANDOM_SEED + i).integers(0, 256, FRAME_SIZE, dtype=np.uint8))
+              for i in range(count)]
+    latency = []
+
+    async def capture():
+        for frame in frames:
+            await tb.axis_source.send(AxiStreamFrame(frame))
+        for i, frame in enumerate(frames):
+            assert await tb.register.read_frame() == frame, f"frame #{i+1} read over AXI-Lite mismatch"
+
+    async def send():
+        for frame in frames:
+            await tb.register.write_frame(frame)
+
+    async def check_sent():
+        for i, frame in enumerate(frames):
+            assert bytearray((await tb.axis_sink.recv()).tdata) == frame, f"frame #{i+1} sent on AXI-Stream mismatch"
+
+    async def roundtrip():
+        for i, frame in enumerate(frames):
+            start = get_sim_time()
+            await tb.axis_source.send(AxiStreamFrame(frame))
+            await tb.register.write_frame(await tb.register.read_frame())
+            assert bytearray((await tb.axis_sink.recv()).tdata) == frame, f"frame #{i+1} round trip mismatch"
+            latency.append((get_sim_time() - start) / period)
+
+    sides = dict(axis2axil=[capture], axil2axis=[send, check_sent], roundtrip=[roundtrip])[mode]
+
+    start = get_sim_time()
+    tasks = [cocotb.start_soon(side()) for side in sides]
+    for task in tasks:
+        await task
+    cycles = (get_sim_time() - start) / period
+
+    result = dict(
+        axil_data_width=tb.axil_data_width,
+        axis_data_width=tb.axis_data_width,
+        mode=mode,
+        frames=count,
+        cycles=cycles,
+        cycles_per_frame=cycles / count,
+        mframes_per_s=count / cycles * clock_mhz,
+        clock_mhz=clock_mhz,
+        polls=tb.register.polls
+    )
+    if latency:
+        result.update(latency_mean=float(np.mean(latency)), latency_max=float(np.max(latency)))
+
+    tb.log.info("%s: %.1f cycles/frame, %.3f Mframes/s at %.0f MHz",
+                mode, result["cycles_per_frame"], result["mframes_per_s"], clock_mhz)
+
+    with open(os.environ.get("BENCH_RESULT", "bench_result.jsonl"), 'a') as f:
+        f.write(json.dumps(result) + "\n")
+
+    await RisingEdge(dut.clk)
+
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(run_benchmark)
+    factory.add_option("mode", os.environ.get("GPC_MODES", ",".join(MODES)).split(","))
+    factory.generate_tests()
+
+# cocotb-test
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
+
+def bench_point(axil_data_width, axis_data_width, result_file, modes, frames, clock_mhz):
+    dut = "gpc_axi_register"
+    toplevel = f"test_{dut}"
+
+    verilog_sources = [
+        os.path.join(tests_dir, f"{toplevel}.sv"),
+        os.path.join(rtl_dir, f"{dut}.sv")
+    ]
+
+    tbutils.run(
+        __file__, toplevel, verilog_sources,
+        parameters={"AXIL_DATA_WIDTH": axil_data_width, "AXIS_DATA_WIDTH": axis_data_width},
+        sim_build=f"{dut}_{axil_data_width}_{axis_data_width}",
+        extra_env={
+            "BENCH_RESULT": result_file,
+            "GPC_MODES": ",".join(modes),
+            "GPC_FRAMES": str(frames),
+            "GPC_CLOCK_MHZ": str(clock_mhz),
+            "GPC_TIMEOUT": str(1000 * frames)
+        }
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--axil', type=int, default=[32, 64], nargs='+', help="AXIL_DATA_WIDTH values")
+    parser.add_argument('--axis', type=int, default=[64, 128, 256, 512], nargs='+', help="AXIS_DATA_WIDTH values")
+    parser.add_argument('-m', '--mode', type=str, default=MODES, nargs='+', choices=MODES, help="benchmark modes")
+    parser.add_argument('-n', '--frames', type=int, default=256, help="frames per mode")
+    parser.add_argument('-f', '--clock', type=float, default=200, help="clock in MHz frames/s is reported at")
+    parser.add_argument('-o', '--output', type=str, default="bench_gpc_axi_register.json", help="output JSON file")
+
+    args = parser.parse_args()
+
+    result_file = os.path.abspath(args.output + ".jsonl")
+    if os.path.exists(result_file):
+        os.remove(result_file)
+
+    failed = []
+    for axil_data_width, axis_data_width in itertools.product(args.axil, args.axis):
+        try:
+            bench_point(axil_data_width, axis_data_width, result_file, args.mode, args.frames, args.clock)
+        except (Exception, SystemExit) as e:
+            # cocotb-test raises SystemExit for failed tests, modes that completed before are still in the results
+            failed.append(dict(axil_data_width=axil_data_width, axis_data_width=axis_data_width, error=str(e)))
+
+    points = []
+    if os.path.exists(result_file):
+        with open(result_file, 'r') as f:
+            points = [json.loads(line) for line in f]
+        os.remove(result_file)
+
+    # RTL revision the numbers belong to, for comparing runs
+    revision = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=rtl_dir, capture_output=True, text=True).stdout.strip()
+
+    with open(args.output, 'w') as f:
+        json.dump(dict(revision=revision, points=points, failed=failed), f, indent=4)
+
+    print(f"{'AXIL':>4} {'AXIS':>4} {'mode':>9} {'cycles/frame':>12} {'Mframes/s':>9} {'lat mean':>8} {'lat max':>7}")
+    for p in points:
+        print(f"{p['axil_data_width']:4d} {p['axis_data_width']:4d} {p['mode']:>9} {p['cycles_per_frame']:12.1f} "
+              f"{p['mframes_per_s']:9.3f} {p.get('latency_mean', float('nan')):8.1f} {p.get('latency_max', float('nan')):7.0f}")
+    for p in failed:
+        print(f"{p['axil_data_width']:4d} {p['axis_data_width']:4d} failed: {p['error']}")
+
+if __name__ == "__main__":
+    main()
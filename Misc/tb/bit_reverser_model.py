@@ -0,0 +1,31 @@
+"""
+Reference model of axis_bit_reverser
+"""
+
+import numpy as np
+
+# every byte value with its bits reversed
+REVERSE = np.array([int(f"{b:08b}"[::-1], 2) for b in range(256)], dtype=np.uint8)
+
+
+def to_beats(tdata, byte_lanes, tkeep=None):
+    """Bytes (and tkeep bits, all set if None) of a frame as (beats, byte_lanes) arrays, padded like AxiStreamSource pads the last beat."""
+    data = np.frombuffer(bytes(tdata), dtype=np.uint8)
+    keep = np.ones(len(data), dtype=bool) if tkeep is None else np.asarray(tkeep, dtype=bool)
+    beats = max(1, -(-len(data) // byte_lanes))
+    padded_data = np.zeros(beats * byte_lanes, dtype=np.uint8)
+    padded_keep = np.zeros(beats * byte_lanes, dtype=bool)
+    padded_data[:len(data)] = data
+    padded_keep[:len(keep)] = keep
+    return padded_data.reshape(beats, byte_lanes), padded_keep.reshape(beats, byte_lanes)
+
+
+def reverse_beats(data, keep):
+    """The beats the reverser outputs for the beats data, keep: bit order of every beat reversed, tkeep with it."""
+    return REVERSE[data[:, ::-1]], keep[:, ::-1]
+
+
+def reverse_frame(tdata, byte_lanes, tkeep=None):
+    """The frame an AxiStreamSink receives (tkeep=0 bytes dropped) when tdata, tkeep is sent into a reverser of byte_lanes bytes."""
+    data, keep = reverse_beats(*to_beats(tdata, byte_lanes, tkeep))
+    return bytearray(data[keep].tobytes())
@@ -0,0 +1,89 @@
+"""
+Frame level AXI-Lite access to gpc_axi_register
+"""
+
+import tbutils
+
+# frame size of gpc_axi_register (FRAME_BYTE_SIZE)
+FRAME_SIZE = 60
+
+
+class GpcRegisterDriver(object):
+    """
+    Reads the frames received on the AXI-Stream side and writes the frames to send over the AXI-Lite
+    interface of gpc_axi_register.
+
+    All beats of a frame go to the master as one multi-beat access, so the address of the next beat is
+    presented as soon as the register accepts it and the data comes back in address order, instead of
+    a complete round trip per beat. Without a frame to read (or room to write) the driver waits for the
+    internal full flags of the register (core, the gpc_axi_register instance) to change. When they are
+    not visible, e.g. not public in Verilator, the validity cells are polled every poll cycles.
+
+    Register map, in cells of the AXI-Lite data width: the received frame from cell 0, its validity
+    cell at cells-1, the frame to send from cell cells and its write validity cell at 2*cells-1.
+    """
+    def __init__(self, axil_master, clock, core=None, poll=2, log=None):
+        self.axil_master = axil_master
+        self.clock = clock
+        self.poll = poll
+        self.log = log
+
+        self.byte_lanes = axil_master.read_if.byte_lanes
+        # MEM_CELL_NUM of the register
+        self.cells = FRAME_SIZE // self.byte_lanes + 2
+        self.frame_length = (self.cells - 1) * self.byte_lanes
+        self.read_valid_addr = (self.cells - 1) * self.byte_lanes
+        self.write_addr = self.cells * self.byte_lanes
+        self.write_valid_addr = (2*self.cells - 1) * self.byte_lanes
+
+        self.read_full = None
+        self.write_full = None
+        if core is not None and hasattr(core, "read_mem_full") and hasattr(core, "write_mem_full"):
+            self.read_full = core.read_mem_full
+            self.write_full = core.write_mem_full
+
+        self.frames_read = 0
+        self.frames_written = 0
+        self.polls = 0
+
+    async def _poll(self, addr, ready):
+        # the register counts reads of its validity cell as data beats (validity_requested compares
+        # the byte address with a bit offset), so polling shifts the end of frame detection, which
+        # waiting on the flags avoids
+        while True:
+            self.polls += 1
+            cell = await self.axil_master.read(addr, self.byte_lanes)
+            if ready(any(cell.data)):
+                return
+            await tbutils.wait_cycles(self.clock, self.poll)
+
+    async def wait_frame(self):
+        """Returns once a received frame can be read."""
+        if self.read_full is not None:
+            await tbutils.wait_until(self.read_full, 1, self.clock)
+        else:
+            await self._poll(self.read_valid_addr, lambda valid: valid)
+
+    async def wait_ready(self):
+        """Returns once a frame can be written."""
+        if self.write_full is not None:
+            await tbutils.wait_until(self.write_full, 0, self.clock)
+        else:
+            await self._poll(self.write_valid_addr, lambda valid: valid)
+
+    async def read_frame(self):
+        await self.wait_frame()
+        resp = await self.axil_master.read(0, self.frame_length)
+        self.frames_read += 1
+        if self.log:
+            self.log.info("Frame #%d read, resp: %s", self.frames_read, resp.resp)
+        return bytearray(resp.data[:FRAME_SIZE])
+
+    async def write_frame(self, data):
+        if len(data) != FRAME_SIZE:
+            raise ValueError(f"Frames are {FRAME_SIZE} bytes, got {len(data)}")
+        await self.wait_ready()
+        resp = await self.axil_master.write(self.write_addr, data)
+        self.frames_written += 1
+        if self.log:
+            self.log.info("Frame #%d written, resp: %s", self.frames_written, resp.resp)
@@ -1,22 +1,28 @@
 import pytest
 import os
+import sys
 import subprocess
 import logging
 import itertools
 import asyncio
 
 import cocotb
-from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, FallingEdge, Timer
 from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
 
-import cocotb_test.simulator
+import numpy as np
 
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink, AxiStreamFrame
 
 from math import ceil
 from binascii import hexlify
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import tbutils
+
+from bit_reverser_model import reverse_frame
+
 class TB(object):
     def __init__(self, dut):
         self.dut = dut
@@ -27,23 +33,16 @@ class TB(object):
         self.test_data = bytearray([x % 256 for x in range(6)] + [x % 256 for x in range(6)] + [0, 46] + [x % 256 for x in range(46)])
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
 
-        cocotb.start_soon(Clock(dut.clk, 5, units="ns").start())
+        self.clock = tbutils.start_clock(dut.clk, 5, units="ns")
 
         self.axis_source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis"), dut.clk, dut.rst)
         self.axis_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis"), dut.clk, dut.rst)
 
+        tbutils.capture(self.log, self.axis_source.log, self.axis_sink.log)
+
     async def reset(self):
-        self.dut.rst.setimmediatevalue(0)
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
-        self.dut.rst.value = 1
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
-        self.dut.rst.value = 0
-        await RisingEdge(self.dut.clk)
-        await RisingEdge(self.dut.clk)
+        await tbutils.reset(self.dut.clk, self.dut.rst, post=2)
 
 
 async def run_test(dut, packets_count=4):
@@ -65,15 +64,10 @@ async def run_test(dut, packets_count=4):
         axis_data = await tb.axis_sink.recv()
         tb.log.info(f"Reversed frame #{i+1} received.")
 
-        assertion_data = test_data[::-1]
-        for i, el in enumerate(assertion_data):
-            binary = bin(el)
-            reverse = binary[-1:1:-1]
-            reverse = reverse + (8 - len(reverse))*'0'
-            assertion_data[i] = int(reverse, 2)
+        assertion_data = reverse_frame(test_data, tb.axis_keep_width)
 
-        tb.log.info(f"Received data: {hexlify(bytearray(axis_data.tdata))}")
-        tb.log.info(f"Expected data: {hexlify(assertion_data)}")
+        tb.log.info("Received data: %s", tbutils.Lazy(hexlify, bytes(axis_data.tdata)))
+        tb.log.info("Expected data: %s", tbutils.Lazy(hexlify, assertion_data))
 
         try:
             assert bytearray(axis_data.tdata) == assertion_data
@@ -84,31 +78,65 @@ async def run_test(dut, packets_count=4):
 
     tb.log.info("Test finished.")
 
+async def run_test_stream(dut, backpressure=0.0):
+    tb = TB(dut)
+
+    count = int(os.environ.get("STREAM_FRAMES", 256))
+    rng = np.random.default_rng(cocotb.RANDOM_SEED)
+
+    # m_axis pauses with probability backpressure in every cycle
+    if backpressure:
+        tb.axis_sink.set_pause_generator(itertools.cycle((rng.random(4096) < backpressure).tolist()))
+
+    await tb.reset()
+
+    # random sizes, a quarter of the frames with random tkeep
+    frames = []
+    for k in range(count):
+        length = int(rng.integers(1, 257))
+        tkeep = rng.integers(0, 2, length).tolist() if rng.random() < 0.25 else None
+        frames.append(AxiStreamFrame(rng.integers(0, 256, length, dtype=np.uint8).tobytes(), tkeep=tkeep))
+    expected = [reverse_frame(frame.tdata, tb.axis_keep_width, frame.tkeep) for frame in frames]
+    beats = sum(-(-len(frame.tdata) // tb.axis_keep_width) for frame in frames)
+
+    # all frames queued at once keep s_axis valid back to back, the output is checked as it arrives
+    start = get_sim_time()
+    for frame in frames:
+        tb.axis_source.send_nowait(frame)
+
+    for k, data in enumerate(expected):
+        axis_data = await tb.axis_sink.recv()
+        assert bytearray(axis_data.tdata) == data, f"frame #{k+1} of {len(frames[k].tdata)} bytes mismatch"
+
+    cycles = (get_sim_time() - start) / tb.clock.period
+
+    # reported outside of the deferred testbench log
+    dut._log.info("AXIS_DATA_WIDTH %d, backpressure %.2f: %d frames, %d beats in %d cycles, %.3f beats/cycle",
+                  tb.axis_data_width, backpressure, count, beats, cycles, beats / cycles)
+
+
 if cocotb.SIM_NAME:
     factory = TestFactory(run_test)
     factory.add_option("packets_count", [0, 1, 4, 8, 32])
     factory.generate_tests()
 
+    factory = TestFactory(run_test_stream)
+    factory.add_option("backpressure", [0.0, 0.5])
+    factory.generate_tests()
+
 # cocotb-test
 tests_dir = os.path.abspath(os.path.dirname(__file__))
 rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
 
-def test_axis_bit_reverser():
+@pytest.mark.parametrize("axis_data_width", [64, 128, 256, 512])
+def test_axis_bit_reverser(axis_data_width):
     dut = "axis_bit_reverser"
-    module = os.path.splitext(os.path.basename(__file__))[0]
     toplevel = dut
 
     test_file = os.path.join(rtl_dir, f"{dut}.v")
 
     verilog_sources = [test_file]
 
-    sim_build = os.path.join(tests_dir, "sim_build", f"{dut}")
+    parameters = {"AXIS_DATA_WIDTH": axis_data_width}
 
-    cocotb_test.simulator.run(
-        python_search=[tests_dir],
-        verilog_sources=verilog_sources,
-        toplevel=toplevel,
-        module=module,
-        sim_build=sim_build,
-        timescale='1ns/1ps'
-    )
+    tbutils.run(__file__, toplevel, verilog_sources, parameters=parameters, sim_build=f"{dut}_{axis_data_width}")
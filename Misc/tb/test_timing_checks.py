@@ -1,24 +1,30 @@
 import pytest
 import os
+import sys
 import subprocess
 import logging
 import itertools
 import asyncio
+import json
 
 import cocotb
-from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, FallingEdge, Timer
 from cocotb.regression import TestFactory
 
-import cocotb_test.simulator
+import numpy as np
 
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink, AxiStreamFrame
 
 from math import ceil
 from binascii import hexlify
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import tbutils
+
+from timing_latency import COUNTER_OFFSET, decode_counter, latency, measurable, summary
+
 class TB(object):
-    def __init__(self, dut):
+    def __init__(self, dut, tx_period=3.1, rx_period=3.0):
         self.dut = dut
 
         self.axis_data_width = dut.AXIS_DATA_WIDTH.value
@@ -27,27 +33,57 @@ class TB(object):
         self.data = bytearray([x % 256 for x in range(50)] + [116, 0] + [x % 256 for x in range(6)] + [0 for x in range(6)])
 
         self.log = logging.getLogger("cocotb.tb")
-        self.log.setLevel(logging.DEBUG)
 
-        cocotb.start_soon(Clock(dut.clk_tx, 3.1, units="ns").start())
-        cocotb.start_soon(Clock(dut.clk_rx, 3, units="ns").start())
+        self.tx_period = tx_period
+        self.rx_period = rx_period
+        tbutils.start_clock(dut.clk_tx, tx_period, units="ns")
+        tbutils.start_clock(dut.clk_rx, rx_period, units="ns")
 
         self.rx_axis_source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "rx_s_axis"), dut.clk_rx, dut.aresetn, reset_active_level=False)
         self.rx_axis_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "rx_m_axis"), dut.clk_rx, dut.aresetn, reset_active_level=False)
 
+        tbutils.capture(self.log, self.rx_axis_source.log, self.rx_axis_sink.log)
+
     async def reset(self):
-        self.dut.aresetn.setimmediatevalue(1)
         self.dut.tx_axis_tvalid.setimmediatevalue(0)
         self.dut.tx_axis_tready.setimmediatevalue(0)
 
+        await tbutils.reset(self.dut.clk_tx, self.dut.aresetn, active_level=False, post=2)
+
+    async def send_packet(self, data, delay):
+        """TX beat, then the RX frame offered delay ns later. Returns the counter the RX checker inserted."""
+        # TX imitation
         await RisingEdge(self.dut.clk_tx)
+        self.dut.tx_axis_tvalid.value = 1
+        self.dut.tx_axis_tready.value = 1
         await RisingEdge(self.dut.clk_tx)
-        self.dut.aresetn.value = 0
-        await RisingEdge(self.dut.clk_tx)
-        await RisingEdge(self.dut.clk_tx)
-        self.dut.aresetn.value = 1
-        await RisingEdge(self.dut.clk_tx)
-        await RisingEdge(self.dut.clk_tx)
+        self.dut.tx_axis_tvalid.value = 0
+        self.dut.tx_axis_tready.value = 0
+
+        # the injected TX to RX delay, from the clk_tx edge that took the beat
+        await Timer(delay, 'ns', round_mode='round')
+        await self.rx_axis_source.send(AxiStreamFrame(data))
+
+        axis_data = await self.rx_axis_sink.recv()
+
+        self.log.info("Received data: %s", tbutils.Lazy(hexlify, bytes(axis_data.tdata)))
+        self.log.info("Original data: %s", tbutils.Lazy(hexlify, data))
+
+        assert bytearray(axis_data.tdata[:COUNTER_OFFSET]) == data[:COUNTER_OFFSET], "RX frame payload mismatch"
+
+        # the TX checker is back in IDLE only once the RX checker has dropped ack, so the next TX beat
+        # starts a new measurement
+        await tbutils.wait_until(self.dut.tx_timing_checker_inst.state, 0)
+
+        return decode_counter(axis_data.tdata)
+
+    def check_counter(self, counter, delay):
+        assert counter > 0, "RX checker inserted a zero counter"
+        if measurable(delay, self.tx_period, self.rx_period):
+            estimate = latency(counter, self.tx_period, self.rx_period)
+            assert abs(estimate - delay) <= self.rx_period + 1e-3, \
+                f"counter {counter} decodes to {estimate:.3f} ns, injected delay {delay:.3f} ns"
+
 
 async def run_test(dut, packets_count=4):
     tb = TB(dut)
@@ -57,49 +93,52 @@ async def run_test(dut, packets_count=4):
 
     for i in range(packets_count):
         tb.log.info(f"Sending frame #{i+1}...")
+        delay = 50 * tb.rx_period
+        counter = await tb.send_packet(test_data, delay)
+        tb.log.info("Frame #%d: counter %d, %.3f ns", i+1, counter, latency(counter, tb.tx_period, tb.rx_period))
+        tb.check_counter(counter, delay)
+
+
+async def run_test_latency(dut, clocks=(3.1, 3.0), delay=100.0):
+    tx_period, rx_period = clocks
+    tb = TB(dut, tx_period, rx_period)
+
+    packets = int(os.environ.get("TIMING_PACKETS", 1000))
+    rng = np.random.default_rng(cocotb.RANDOM_SEED)
+
+    await tb.reset()
+
+    # delays spread over one clk_rx period, which the counter can only resolve to a cycle
+    delays = delay + np.round(rng.random(packets) * rx_period, 3)
+    counters = []
+    for d in delays.tolist():
+        counter = await tb.send_packet(tb.data, d)
+        tb.check_counter(counter, d)
+        counters.append(counter)
+
+    counters = np.array(counters)
+    estimates = latency(counters, tx_period, rx_period)
+    result = dict(
+        tx_period=tx_period,
+        rx_period=rx_period,
+        delay=delay,
+        measurable=measurable(delay, tx_period, rx_period),
+        counter=summary(counters),
+        latency_ns=summary(estimates),
+        error_ns=summary(estimates - delays)
+    )
+
+    # reported outside of the deferred testbench log
+    dut._log.info("clk_tx %.3f ns, clk_rx %.3f ns, delay %.1f ns: counter min %d mean %.2f p99 %d max %d, "
+                  "latency mean %.3f ns, error mean %.3f ns max %.3f ns", tx_period, rx_period, delay,
+                  result["counter"]["min"], result["counter"]["mean"], result["counter"]["p99"], result["counter"]["max"],
+                  result["latency_ns"]["mean"], result["error_ns"]["mean"], np.abs(estimates - delays).max())
+
+    # build output, kept out of the source tree
+    result_file = os.environ.get("TIMING_RESULT", os.path.join(tbutils.sim_build_dir(tests_dir), "timing_latency.jsonl"))
+    with open(result_file, 'a') as f:
+        f.write(json.dumps(result) + "\n")
 
-        # TX imitation
-        tb.log.info("Sending TX frame...")
-        await RisingEdge(tb.dut.clk_tx)
-        tb.dut.tx_axis_tvalid.setimmediatevalue(1)
-        tb.dut.tx_axis_tready.setimmediatevalue(1)
-        await RisingEdge(tb.dut.clk_tx)
-        tb.dut.tx_axis_tvalid.setimmediatevalue(0)
-        tb.dut.tx_axis_tready.setimmediatevalue(0)
-        tb.log.info("TX frame sent.")
-
-        # Wait some RX time
-        tb.log.info("Waiting approximate time till frame gets to RX...")
-        for j in range(50):
-            await RisingEdge(tb.dut.clk_rx)
-
-        # Send RX packet
-        tb.log.info("Sending RX frame...")
-        axis_frame = AxiStreamFrame(test_data)
-        await tb.rx_axis_source.send(axis_frame)
-        await RisingEdge(tb.dut.clk_rx)
-        tb.log.info("RX frame sent.")
-
-        tb.log.info("Recovering RX frame...")
-        axis_data = await tb.rx_axis_sink.recv()
-        tb.log.info("RX frame recovered.")
-
-        # Recover data
-        tb.log.info(f"Received data: {hexlify(bytearray(axis_data.tdata))}")
-        tb.log.info(f"Original data: {hexlify(test_data)}")
-
-        # Assert data
-        try:
-            assert bytearray(axis_data.tdata[:-6]) == test_data[:-6]
-            assert bytearray(axis_data.tdata[-6:]) != bytearray([0 for x in range(6)])
-            tb.log.info("Data assertion successful.")
-        except Exception as e:
-            tb.log.error("Data assertion failed.")
-            raise e
-
-        # Wait some time before the next packet
-        for j in range(25):
-            await RisingEdge(tb.dut.clk_rx)
 
 if cocotb.SIM_NAME:
     factory = TestFactory(run_test)
@@ -107,12 +146,17 @@ if cocotb.SIM_NAME:
     factory.add_option("packets_count", [4])
     factory.generate_tests()
 
+    # clk_tx/clk_rx periods in ns and injected delays; below T_tx + 8 T_rx the counter saturates
+    factory = TestFactory(run_test_latency)
+    factory.add_option("clocks", [(3.1, 3.0), (3.0, 3.1), (4.0, 3.0), (3.0, 4.0), (3.2, 3.2)])
+    factory.add_option("delay", [float(x) for x in os.environ.get("TIMING_DELAYS", "20,50,200,1000").split(",")])
+    factory.generate_tests()
+
 # cocotb-test
 tests_dir = os.path.abspath(os.path.dirname(__file__))
-rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'src'))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
 
 def test_timing_checks():
-    module = os.path.splitext(os.path.basename(__file__))[0]
     toplevel = "test_timing_checks"
 
     test_file = os.path.join(tests_dir, "test_timing_checks.sv")
@@ -120,13 +164,4 @@ def test_timing_checks():
 
     verilog_sources = [test_file] + rtl_files
 
-    sim_build = os.path.join(tests_dir, "sim_build", "test_timing_checks")
-
-    cocotb_test.simulator.run(
-        python_search=[tests_dir],
-        verilog_sources=verilog_sources,
-        toplevel=toplevel,
-        module=module,
-        sim_build=sim_build,
-        timescale='1ns/1ps'
-    )
+    tbutils.run(__file__, toplevel, verilog_sources, sim_build="test_timing_checks")
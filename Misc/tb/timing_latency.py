@@ -0,0 +1,41 @@
+"""
+Decoding of the latency counter rx_timing_checker inserts into the received beat
+"""
+
+import numpy as np
+
+# the counter replaces the top 48 bits of the first received beat
+COUNTER_OFFSET = 464 // 8
+COUNTER_BYTES = 6
+
+# The counter starts when tx_started_req has crossed the 5 stage synchronizer of test_timing_checks.sv
+# and counts clk_rx cycles until the first beat is accepted. For a beat offered delay after the TX
+# handshake, counter = (delay - T_tx) / T_rx - 5 within one clk_rx cycle, once delay is at least
+# T_tx + 8 * T_rx; shorter delays all read as 1 to 3.
+SYNC_CYCLES = 5
+MIN_CYCLES = 8
+
+
+def decode_counter(tdata):
+    """Counter value (clk_rx cycles) of a frame received from rx_timing_checker."""
+    return int.from_bytes(bytes(tdata[COUNTER_OFFSET:COUNTER_OFFSET+COUNTER_BYTES]), 'little')
+
+
+def latency(counter, tx_period, rx_period):
+    """TX handshake to RX beat delay a counter value stands for, in the unit of the periods."""
+    return (counter + SYNC_CYCLES) * rx_period + tx_period
+
+
+def measurable(delay, tx_period, rx_period):
+    """Whether the counter resolves delay instead of saturating at its minimum."""
+    return delay >= tx_period + MIN_CYCLES * rx_period
+
+
+def summary(values):
+    """min/mean/percentiles/max of a sequence of samples."""
+    v = np.asarray(values, dtype=float)
+    if not len(v):
+        return {}
+    p50, p90, p99 = np.percentile(v, [50, 90, 99])
+    return dict(count=len(v), min=float(v.min()), mean=float(v.mean()), p50=float(p50), p90=float(p90),
+                p99=float(p99), max=float(v.max()), std=float(v.std()))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Throughput and latency of dwt_module over LENGTH, against the cycle model of dwt_timing.py
+
+Random frames are sent back to back at every LENGTH (essentials::LENGTH is replaced in the build).
+Per block the driver timestamps en, the last pixel, rdy and the first and last result. Reported:
+cycles per block and the cycles the input stalls waiting for rdy (first, main and last blocks),
+cycles per frame, frame latency from en of the first block to the last result, pixels per cycle and
+frames/s at the given clock. Every measured number is checked against the model, which --predict
+prints without simulating.
+"""
+
+import os
+import json
+import argparse
+import subprocess
+
+import numpy as np
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from test_dwt_module import TB, MODULES, TRUNCATE, tbutils
+import dwt_model
+import dwt_timing
+
+FIELDS = ["input", "first_result", "latency", "rdy", "period", "stall"]
+
+
+def by_kind(blocks):
+    """Summaries of the block numbers of the first, main and last blocks of the frames."""
+    last = max(b["block"] for b in blocks)
+    kinds = dict(first=lambda b: b == 0, main=lambda b: 0 < b < last, last=lambda b: b == last)
+    return {kind: {field: dwt_timing.summary(b[field] for b in blocks if match(b["block"])) for field in FIELDS}
+            for kind, match in kinds.items()}
+
+
+async def run_profile(dut):
+    length = int(os.environ.get("DWT_LENGTH", dwt_model.LENGTH))
+    count = int(os.environ.get("DWT_FRAMES", 2))
+    # frames/s is reported for a DWT_CLOCK_MHZ clock, whatever the period of the testbench clock
+    clock_mhz = float(os.environ.get("DWT_CLOCK_MHZ", 100))
+    # DWT_CHECK=0 measures the timing without comparing the coefficients to dwt_model.py
+    check = bool(int(os.environ.get("DWT_CHECK", 1)))
+
+    tb = TB(dut, count, length)
+
+    images = np.random.default_rng(cocotb.RANDOM_SEED).integers(0, 256, (count, length, length), dtype=np.uint8)
+    expected = dwt_model.dwt2d(images, TRUNCATE)
+    out = np.zeros_like(expected)
+
+    await tb.reset()
+
+    for k in range(count):
+        await tb.dwt.transform(images[k].reshape(-1), out[k], expected[k] if check else None)
+
+    period = tb.clock.period
+    blocks = dwt_timing.measure(tb.dwt.timestamps, period)
+    frames = dwt_timing.measure_frames(tb.dwt.timestamps, period)
+    model = dwt_timing.frame_model(length, clock_mhz)
+
+    mismatches = dwt_timing.mismatches(blocks, length)
+    for field in ("cycles_per_frame", "latency"):
+        mismatches += [(f["image"], None, field, f[field], model[field]) for f in frames
+                       if f[field] is not None and f[field] != model[field]]
+
+    cycles = [f["cycles_per_frame"] for f in frames if f["cycles_per_frame"] is not None]
+    result = dict(
+        length=length,
+        frames=count,
+        model=model,
+        blocks=by_kind(blocks),
+        cycles_per_frame=dwt_timing.summary(cycles),
+        latency=dwt_timing.summary(f["latency"] for f in frames),
+        mismatches=[dict(zip(["image", "block", "field", "measured", "model"], m)) for m in mismatches[:20]],
+        match=not mismatches
+    )
+
+    # reported outside of the deferred testbench log
+    dut._log.info("LENGTH %d: %s cycles/frame (model %d), latency %s cycles (model %d), %d numbers differ from the model",
+                  length, result["cycles_per_frame"].get("mean"), model["cycles_per_frame"],
+                  result["latency"].get("mean"), model["latency"], len(mismatches))
+
+    with open(os.environ.get("BENCH_RESULT", "bench_result.jsonl"), 'a') as f:
+        f.write(json.dumps(result) + "\n")
+
+    assert not mismatches, "measured cycles differ from the model, (image, block, field, measured, model): " + \
+        ", ".join(str(m) for m in mismatches[:5])
+
+    await RisingEdge(dut.clk)
+
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(run_profile)
+    factory.generate_tests()
+
+# cocotb-test
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
+
+def essentials(length, build_dir):
+    """essentials.sv with LENGTH set to length, written into build_dir."""
+    os.makedirs(build_dir, exist_ok=True)
+    path = os.path.join(build_dir, "essentials.sv")
+    with open(path, 'w') as f:
+        f.write(f"package essentials;\n\tlocalparam LENGTH = {length};\nendpackage\n")
+    return path
+
+def bench_point(length, result_file, frames, clock_mhz, check=True):
+    dut = "dwt_module"
+    sim_build = f"{dut}_{length}"
+
+    verilog_sources = [essentials(length, os.path.join(tbutils.sim_build_dir(tests_dir), sim_build))]
+    verilog_sources += [os.path.join(rtl_dir, f"{module}.sv") for module in MODULES]
+
+    tbutils.run(
+        __file__, dut, verilog_sources,
+        sim_build=sim_build,
+        extra_env={
+            "BENCH_RESULT": result_file,
+            "DWT_LENGTH": str(length),
+            "DWT_FRAMES": str(frames),
+            "DWT_CLOCK_MHZ": str(clock_mhz),
+            "DWT_CHECK": str(int(check))
+        }
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-l', '--length', type=int, default=[16, 32, 64, 128, 256], nargs='+', help="LENGTH values")
+    parser.add_argument('-n', '--frames', type=int, default=2, help="frames per LENGTH")
+    parser.add_argument('-f', '--clock', type=float, default=100, help="clock in MHz frames/s is reported at")
+    parser.add_argument('-p', '--predict', action='store_true', help="print the model only, without simulating")
+    parser.add_argument('--no_check', action='store_true', help="do not compare the coefficients to the model (DWT_CHECK=0)")
+    parser.add_argument('-o', '--output', type=str, default="bench_dwt_module.json", help="output JSON file")
+
+    args = parser.parse_args()
+
+    if args.predict:
+        print(f"{'LENGTH':>6} {'cycles/frame':>12} {'latency':>8} {'stall':>7} {'pixels/cycle':>12} {'frames/s':>10}")
+        for length in args.length:
+            m = dwt_timing.frame_model(length, args.clock)
+            print(f"{length:6d} {m['cycles_per_frame']:12d} {m['latency']:8d} {m['stall']:7d} "
+                  f"{m['pixels_per_cycle']:12.3f} {m['frames_per_s']:10.1f}")
+        return
+
+    result_file = os.path.abspath(args.output + ".jsonl")
+    if os.path.exists(result_file):
+        os.remove(result_file)
+
+    failed = []
+    for length in args.length:
+        try:
+            bench_point(length, result_file, args.frames, args.clock, not args.no_check)
+        except (Exception, SystemExit) as e:
+            # cocotb-test raises SystemExit for a failed test, a point that differs from the model is still in the results
+            failed.append(dict(length=length, error=str(e)))
+
+    points = []
+    if os.path.exists(result_file):
+        with open(result_file, 'r') as f:
+            points = [json.loads(line) for line in f]
+        os.remove(result_file)
+
+    # RTL revision the numbers belong to, for comparing runs
+    revision = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=rtl_dir, capture_output=True, text=True).stdout.strip()
+
+    with open(args.output, 'w') as f:
+        json.dump(dict(revision=revision, points=points, failed=failed), f, indent=4)
+
+    print(f"{'LENGTH':>6} {'cycles/frame':>12} {'model':>8} {'latency':>8} {'model':>8} {'main block':>10} {'stall':>5} "
+          f"{'frames/s':>10} {'match':>5}")
+    for p in points:
+        m = p["model"]
+        main_block = p["blocks"]["main"]
+        print(f"{p['length']:6d} {p['cycles_per_frame'].get('mean', float('nan')):12.0f} {m['cycles_per_frame']:8d} "
+              f"{p['latency'].get('mean', float('nan')):8.0f} {m['latency']:8d} "
+              f"{main_block['period'].get('mean', float('nan')):10.0f} {main_block['stall'].get('mean', float('nan')):5.0f} "
+              f"{m['frames_per_s']:10.1f} {'yes' if p['match'] else 'no':>5}")
+    for p in failed:
+        print(f"{p['length']:6d} failed: {p['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Pixel stream driver of dwt_module
+"""
+
+import numpy as np
+
+from cocotb.triggers import RisingEdge
+from cocotb.utils import get_sim_time
+
+import tbutils
+
+from dwt_model import LENGTH, block_sizes
+
+
+class DwtDriver(object):
+    """
+    Sends pixel streams to dwt_module and collects its s, d outputs.
+
+    Every block of the stream (3 rows for the first one, 2 for the following ones, 1 for the last) is
+    sent once rdy is set: en for one cycle, then one pixel per cycle. The LENGTH values of s and d
+    output while result is set are block b of the output, rows b and LENGTH/2+b, and are stored into
+    the rows of the output array as they come.
+
+    Like dwt_module_tb.sv, en is set after the edge rdy is sampled set on. Set as soon as rdy is, en
+    would be sampled in ST_MAIN_BLOCK before the last block, and input_block would take the last
+    block with iter_flag 1.
+
+    The sim times (steps) of every block go to timestamps: rdy sampled set at rdy, en sampled at en,
+    the last pixel sampled at input_end, and the first and last result sampled at first_result and
+    last_result.
+    """
+    def __init__(self, dut, clock, length=LENGTH, log=None):
+        self.dut = dut
+        self.clock = clock
+        self.length = length
+        self.log = log
+
+        # "in" is a Python keyword
+        self.pixel = dut._id("in", extended=False)
+
+        self.sizes = block_sizes(length)
+        self.starts = np.cumsum([0] + self.sizes[:-1]).tolist()
+        self.blocks = len(self.sizes)
+
+        self.images = 0
+        self.timestamps = []
+
+        dut.en.setimmediatevalue(0)
+        self.pixel.setimmediatevalue(0)
+
+    async def send_block(self, pixels, stamp):
+        await tbutils.wait_until(self.dut.rdy, 1, self.clock)
+        stamp["rdy"] = get_sim_time()
+        self.dut.en.value = 1
+        await RisingEdge(self.clock)
+        stamp["en"] = get_sim_time()
+        self.dut.en.value = 0
+        # input_block stores its first pixel the cycle after dwt_module samples en
+        for pixel in pixels.tolist():
+            self.pixel.value = pixel
+            await RisingEdge(self.clock)
+        stamp["input_end"] = get_sim_time()
+
+    async def receive_block(self, s, d, stamp):
+        """Stores the next LENGTH results into the arrays s and d."""
+        await tbutils.wait_until(self.dut.result, 1)
+        k = 0
+        while k < self.length:
+            await RisingEdge(self.clock)
+            # s, d and result change on the same edge
+            if int(self.dut.result.value):
+                if not k:
+                    stamp["first_result"] = get_sim_time()
+                s[k] = int(self.dut.s.value)
+                d[k] = int(self.dut.d.value)
+                k += 1
+        stamp["last_result"] = get_sim_time()
+
+    async def transform(self, pixels, out, expected=None):
+        """
+        Sends the pixel stream pixels (LENGTH*LENGTH) and stores the output into out (LENGTH, LENGTH).
+        With expected, every block is compared as soon as it is complete.
+        """
+        half = self.blocks
+        for b, (start, size) in enumerate(zip(self.starts, self.sizes)):
+            stamp = dict(image=self.images, block=b)
+            await self.send_block(pixels[start:start+size], stamp)
+            await self.receive_block(out[b], out[half+b], stamp)
+            self.timestamps.append(stamp)
+
+            if expected is not None:
+                for row in (b, half+b):
+                    cols = np.flatnonzero(out[row] != expected[row])
+                    assert not len(cols), (f"image #{self.images+1} block {b}: row {row} mismatch at {len(cols)} "
+                                           f"columns from {cols[0]}: {out[row, cols[0]]} expected {expected[row, cols[0]]}")
+
+        # the rdy pulse after the last block comes before dwt_module is back in ST_IDLE
+        await tbutils.wait_until(self.dut.rdy, 1, self.clock)
+        await tbutils.wait_until(self.dut.rdy, 0)
+
+        self.images += 1
+        if self.log:
+            self.log.info("Image #%d transformed", self.images)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Bit exact NumPy model of dwt_module, the CDF 5/3 lifting 2D DWT
+
+All functions work on whole images, or batches of them in the leading axes, at once.
+"""
+
+import os
+import argparse
+
+import numpy as np
+
+# essentials::LENGTH
+LENGTH = 256
+
+
+def check_length(length):
+    # the 8 bit counters of row_to_cdf and dwt_module and the block sequence of dwt_module limit LENGTH
+    if length % 2 or not 6 <= length <= 256:
+        raise ValueError(f"LENGTH must be even and from 6 to 256, got {length}")
+
+
+def lift(x0, x1, x2):
+    """
+    s, d cdf5_3 computes for the triples x0, x1, x2 it is fed one after another along the last axis.
+
+    Inputs are zero extended to the signed 16 bit x0, x1, x2 of cdf5_3, d_prev is 0 for the first
+    triple and the d of the previous one after it. The results are int16, the module outputs their
+    low 8 bits.
+    """
+    x0, x1, x2 = (np.asarray(x, dtype=np.uint8).astype(np.int16) for x in (x0, x1, x2))
+    d = x1 - ((x0 + x2) >> 1)
+    d_prev = np.zeros_like(d)
+    d_prev[..., 1:] = d[..., :-1]
+    s = x0 + ((d + d_prev) >> 2)
+    return s, d
+
+
+def row_transform(rows, truncate=False):
+    """
+    Coefficient stream coefs_to_row outputs for rows (..., LENGTH) through row_processor.
+
+    row_to_cdf pairs every even pixel with its two neighbours, repeating the last pixel for the
+    missing right one. coefs_to_row outputs the LENGTH/2 s, one more s cdf5_3 computes for the last
+    triple again (with its own d as d_prev) after tf_dis, then the LENGTH/2 d: LENGTH+1 values.
+
+    In its last ST_OUT_S cycle coefs_to_row writes that d to d_bank[LENGTH/2], past the end of the
+    array, which the LRM ignores. With truncate, the index is cut to the width of the d_bank index
+    as Verilator does, and for a power of two LENGTH/2 the write replaces the first d.
+    """
+    rows = np.asarray(rows, dtype=np.uint8)
+    x0 = rows[..., 0::2]
+    x1 = rows[..., 1::2]
+    x2 = np.concatenate([rows[..., 2::2], rows[..., -1:]], axis=-1)
+    s, d = lift(x0, x1, x2)
+    s_last = x0[..., -1].astype(np.int16) + ((2 * d[..., -1]) >> 2)
+    half = d.shape[-1]
+    if truncate and not half & (half - 1):
+        d = np.concatenate([d[..., -1:], d[..., 1:]], axis=-1)
+    return np.concatenate([s, s_last[..., None], d], axis=-1).astype(np.uint8)
+
+
+def col_transform(row_0, row_1, row_2):
+    """
+    s, d col_processor outputs for the coefficient streams of the three rows of a block.
+
+    The same cdf5_3 runs along the streams, so d_prev is the d of the previous coefficient of the
+    stream, not of the previous block.
+    """
+    s, d = lift(row_0, row_1, row_2)
+    return s.astype(np.uint8), d.astype(np.uint8)
+
+
+def block_sizes(length=LENGTH):
+    """Pixels input_block takes for each of the LENGTH/2 blocks: 3 rows, then 2 rows, 1 row for the last one."""
+    check_length(length)
+    return [3*length] + [2*length] * (length//2 - 2) + [length]
+
+
+def block_rows(pixels, length=LENGTH):
+    """
+    Rows input_block hands block_processor for each of the LENGTH/2 blocks of the pixel stream
+    pixels (..., LENGTH*LENGTH): row_0 of the first block and row_1, row_2 (..., LENGTH/2, LENGTH)
+    of all blocks.
+
+    The first block takes 3 rows, the following ones 2 and the last one 1, whose row_2 is its row_1.
+    """
+    check_length(length)
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    lead = pixels.shape[:-1]
+    first = pixels[..., :3*length].reshape(lead + (3, length))
+    rest = pixels[..., 3*length:].reshape(lead + (length - 3, length))
+    row_1 = np.concatenate([first[..., 1:2, :], rest[..., 0::2, :]], axis=-2)
+    row_2 = np.concatenate([first[..., 2:3, :], rest[..., 1::2, :], rest[..., -1:, :]], axis=-2)
+    return first[..., 0, :], row_1, row_2
+
+
+def coefficients(pixels, length=LENGTH, truncate=False):
+    """
+    s and d of dwt_module for the pixel stream pixels (..., LENGTH*LENGTH) as (..., LENGTH, LENGTH+1):
+    block b in rows b (s) and LENGTH/2+b (d), the LENGTH values output while result is set and
+    the one on s, d in the cycle after. truncate is that of row_transform.
+
+    Blocks after the first one take row_0 from row_shift_bank, the row_2 stream of the previous block.
+    """
+    row_0, row_1, row_2 = block_rows(pixels, length)
+    rc_1 = row_transform(row_1, truncate)
+    rc_2 = row_transform(row_2, truncate)
+    rc_0 = np.concatenate([row_transform(row_0, truncate)[..., None, :], rc_2[..., :-1, :]], axis=-2)
+    s, d = col_transform(rc_0, rc_1, rc_2)
+    return np.concatenate([s, d], axis=-2)
+
+
+def dwt_module(pixels, length=LENGTH, truncate=False):
+    """Output of dwt_module for the pixel stream pixels, s and d of block b in rows b and LENGTH/2+b."""
+    return coefficients(pixels, length, truncate)[..., :length]
+
+
+def dwt2d(image, truncate=False):
+    """Output of dwt_module for image (..., LENGTH, LENGTH) sent row by row."""
+    image = np.asarray(image, dtype=np.uint8)
+    length = image.shape[-1]
+    if image.shape[-2] != length:
+        raise ValueError(f"Images must be square, got {image.shape[-2]}x{length}")
+    return dwt_module(image.reshape(image.shape[:-2] + (length*length,)), length, truncate)
+
+
+def tb_stream(image):
+    """
+    Pixel stream dwt_module_tb.sv sends for image (..., LENGTH, LENGTH).
+
+    The testbench starts block i at pixel i times the pixel count of block i-1, so from the third
+    block on it sends rows 2i, 2i+1 instead of 2i+1, 2i+2.
+    """
+    image = np.asarray(image, dtype=np.uint8)
+    length = image.shape[-1]
+    din = image.reshape(image.shape[:-2] + (length*length,))
+    counts = block_sizes(length)
+    starts = [0] + [i * counts[i-1] for i in range(1, len(counts))]
+    return np.concatenate([din[..., start:start+count] for start, count in zip(starts, counts)], axis=-1)
+
+
+def tb_output(image, truncate=False):
+    """
+    What dwt_module_tb.sv writes for image (..., LENGTH, LENGTH): the output of dwt_module for
+    tb_stream(image), sampled one cycle late.
+    """
+    image = np.asarray(image, dtype=np.uint8)
+    return coefficients(tb_stream(image), image.shape[-1], truncate)[..., 1:]
+
+
+def read_image(path, length=LENGTH):
+    """Image an SV testbench $freads from path: its first LENGTH*LENGTH bytes."""
+    return np.fromfile(path, dtype=np.uint8, count=length*length).reshape(length, length)
+
+
+def map_images(path, length=LENGTH):
+    """Every LENGTH*LENGTH bytes of the file path as one image, memory mapped (images, LENGTH, LENGTH)."""
+    count = os.path.getsize(path) // (length*length)
+    return np.memmap(path, dtype=np.uint8, mode='r', shape=(count, length, length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Computes the output file of dwt_module_tb.sv for an input file")
+    parser.add_argument('input', type=str, help="input image file")
+    parser.add_argument('-o', '--output', type=str, help="output file to write")
+    parser.add_argument('-c', '--check', type=str, help="output file to compare with")
+    parser.add_argument('-l', '--length', type=int, default=LENGTH, help="LENGTH of the image")
+    parser.add_argument('--stream', action='store_true', help="send the image row by row instead of in the order of dwt_module_tb.sv")
+    parser.add_argument('--truncate', action='store_true', help="truncate out of range array indices like Verilator")
+
+    args = parser.parse_args()
+
+    image = read_image(args.input, args.length)
+    out = dwt2d(image, args.truncate) if args.stream else tb_output(image, args.truncate)
+
+    if args.output:
+        out.tofile(args.output)
+
+    if args.check:
+        ref = np.fromfile(args.check, dtype=np.uint8).reshape(out.shape)
+        rows, cols = np.nonzero(out != ref)
+        print(f"{args.check}: {out.size - len(rows)}/{out.size} match")
+        for row, col in list(zip(rows, cols))[:10]:
+            print(f"  row {row} col {col}: {out[row, col]} expected {ref[row, col]}")
+        if len(rows):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cycle model of dwt_module as a function of LENGTH, and the same numbers from DwtDriver timestamps
+"""
+
+import numpy as np
+
+from dwt_model import block_sizes
+
+# Cycles of a block of N pixels, counted from the edge dwt_module samples en (E):
+#   E+N          input_block stores the last pixel, block_processor is enabled the cycle after
+#   E+N+7        first edge result is sampled set: row_to_cdf, cdf5_3, coefs_to_row, col cdf5_3
+#   E+N+LENGTH+6 last edge result is sampled set
+#   E+N+LENGTH+7 result_counter reaches LENGTH and rdy is set, ST_FIRST_BLOCK sets it one cycle later
+# The pulse of rdy after the last block comes in ST_LAST_BLOCK, rdy is set again in ST_IDLE 2 cycles later.
+FIRST_RESULT = 7
+LAST_RESULT = 6
+RDY = 1
+FIRST_BLOCK_RDY = 2
+LAST_BLOCK_IDLE = 2
+# a driver like DwtDriver samples rdy on the next edge and en is sampled on the one after
+RDY_SAMPLE = 1
+EN = 1
+
+
+def block_model(length):
+    """
+    Cycle counts of every block of a frame, for a driver that sends the next block as soon as it sees rdy:
+      input         en to the last pixel stored, the pixels of the block
+      first_result  last pixel to the first result
+      latency       last pixel to the last result
+      rdy           last result to the edge the driver samples the rdy it sends the next block on
+      period        en to en of the next block (of the next frame for the last block)
+      stall         last pixel to en of the next block, the input waiting for rdy
+    """
+    sizes = block_sizes(length)
+    blocks = []
+    for b, pixels in enumerate(sizes):
+        rdy = (FIRST_BLOCK_RDY if b == 0 else RDY) + RDY_SAMPLE
+        # the next frame waits for rdy in ST_IDLE
+        if b == len(sizes) - 1:
+            rdy += LAST_BLOCK_IDLE
+        stall = length + LAST_RESULT + rdy + EN
+        blocks.append(dict(
+            block=b,
+            input=pixels,
+            first_result=FIRST_RESULT,
+            latency=length + LAST_RESULT,
+            rdy=rdy,
+            period=pixels + stall,
+            stall=stall
+        ))
+    return blocks
+
+
+def frame_model(length, clock_mhz=None):
+    """
+    Frame numbers of block_model(length): 1.5 LENGTH^2 + 4.5 LENGTH + 3 cycles per frame and
+    1.5 LENGTH^2 + 4.5 LENGTH - 2 cycles from en of the first block to the last result, with frames/s
+    at clock_mhz.
+    """
+    blocks = block_model(length)
+    cycles = sum(b["period"] for b in blocks)
+    last = blocks[-1]
+    result = dict(
+        length=length,
+        cycles_per_frame=cycles,
+        latency=cycles - last["period"] + last["input"] + last["latency"],
+        stall=sum(b["stall"] for b in blocks),
+        pixels_per_cycle=length * length / cycles
+    )
+    if clock_mhz:
+        result.update(clock_mhz=clock_mhz, frames_per_s=clock_mhz * 1e6 / cycles)
+    return result
+
+
+def _cycles(start, end, period):
+    return int(round((end - start) / period))
+
+
+def measure(timestamps, period):
+    """
+    block_model numbers of the blocks DwtDriver recorded in timestamps, in cycles of period steps.
+    The last block has no period and stall, no next block was sent.
+    """
+    blocks = []
+    for k, t in enumerate(timestamps):
+        m = dict(
+            image=t["image"],
+            block=t["block"],
+            input=_cycles(t["en"], t["input_end"], period),
+            first_result=_cycles(t["input_end"], t["first_result"], period),
+            latency=_cycles(t["input_end"], t["last_result"], period),
+            rdy=None,
+            period=None,
+            stall=None
+        )
+        if k + 1 < len(timestamps):
+            n = timestamps[k+1]
+            m["rdy"] = _cycles(t["last_result"], n["rdy"], period)
+            m["period"] = _cycles(t["en"], n["en"], period)
+            m["stall"] = _cycles(t["input_end"], n["en"], period)
+        blocks.append(m)
+    return blocks
+
+
+def measure_frames(timestamps, period):
+    """Cycles per frame (en to en of the next frame) and latency (en to the last result) of every frame."""
+    first = [t for t in timestamps if t["block"] == 0]
+    frames = []
+    for k, t in enumerate(first):
+        last = [s for s in timestamps if s["image"] == t["image"]][-1]
+        frames.append(dict(
+            image=t["image"],
+            cycles_per_frame=_cycles(t["en"], first[k+1]["en"], period) if k + 1 < len(first) else None,
+            latency=_cycles(t["en"], last["last_result"], period)
+        ))
+    return frames
+
+
+def mismatches(measured, length):
+    """(image, block, field, measured, model) of every number of measure() differing from block_model()."""
+    model = block_model(length)
+    result = []
+    for m in measured:
+        expected = model[m["block"]]
+        for field in ("input", "first_result", "latency", "rdy", "period", "stall"):
+            if m[field] is not None and m[field] != expected[field]:
+                result.append((m["image"], m["block"], field, m[field], expected[field]))
+    return result
+
+
+def summary(values):
+    """min/mean/max of a sequence of samples."""
+    v = np.asarray([x for x in values if x is not None], dtype=float)
+    if not len(v):
+        return {}
+    return dict(count=len(v), min=float(v.min()), mean=float(v.mean()), max=float(v.max()))
@@ -0,0 +1,127 @@
+import pytest
+import os
+import sys
+import logging
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+from cocotb.result import SimTimeoutError
+from cocotb.utils import get_sim_time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import tbutils
+
+import dwt_model
+from dwt_driver import DwtDriver
+
+# modules of dwt_module, after the essentials package
+MODULES = ["cdf5_3", "row_to_cdf", "coefs_to_row", "row_processor", "row_shift_bank", "col_processor",
+           "block_processor", "input_block", "dwt_module"]
+
+# input files of the SystemVerilog testbenches
+IMAGES = ["im_Monkey.bin", "im_Anna.bin", "image.bin"]
+
+# Verilator truncates the out of range d_bank index of coefs_to_row, see dwt_model.row_transform
+TRUNCATE = (cocotb.SIM_NAME or "").lower().startswith("verilator")
+
+class TB(object):
+    def __init__(self, dut, images=1, length=dwt_model.LENGTH):
+        self.dut = dut
+
+        self.length = length
+
+        self.log = logging.getLogger("cocotb.tb")
+
+        self.clock = tbutils.start_clock(dut.clk, 20, units="ns")
+
+        tbutils.capture(self.log)
+
+        self.dwt = DwtDriver(dut, dut.clk, self.length, log=self.log)
+
+        # a broken rdy/en handshake stalls instead of failing, DWT_TIMEOUT=<cycles per image>
+        cycles = int(os.environ.get("DWT_TIMEOUT", 4 * self.length * self.length))
+        cocotb.start_soon(self.watchdog(cycles * images))
+
+    async def watchdog(self, cycles):
+        await tbutils.wait_cycles(self.dut.clk, cycles)
+        raise SimTimeoutError(f"Test did not finish in {cycles} cycles")
+
+    async def reset(self):
+        await tbutils.reset(self.dut.clk, self.dut.resetn, active_level=False, post=2)
+
+
+def load_images(length):
+    """
+    Test images, in batches of (images, LENGTH, LENGTH): the files in DWT_IMAGES, memory mapped with
+    LENGTH*LENGTH bytes per image, and DWT_RANDOM random images.
+    """
+    names = os.environ.get("DWT_IMAGES", ",".join(IMAGES)).split(",")
+    batches = [dwt_model.map_images(os.path.join(tests_dir, name), length) for name in names if name]
+
+    rng = np.random.default_rng(cocotb.RANDOM_SEED)
+    batches.append(rng.integers(0, 256, (int(os.environ.get("DWT_RANDOM", 2)), length, length), dtype=np.uint8))
+
+    return [batch for batch in batches if len(batch)]
+
+
+async def run_test(dut, order="rows"):
+    length = dwt_model.LENGTH
+    batches = load_images(length)
+    count = sum(len(batch) for batch in batches)
+
+    tb = TB(dut, count)
+
+    # DWT_OUTPUT=<file.npy> keeps the collected coefficients
+    shape = (count, length, length)
+    if os.environ.get("DWT_OUTPUT"):
+        out = np.lib.format.open_memmap(os.environ["DWT_OUTPUT"], mode='w+', dtype=np.uint8, shape=shape)
+    else:
+        out = np.zeros(shape, dtype=np.uint8)
+
+    await tb.reset()
+
+    start = get_sim_time()
+    k = 0
+    for images in batches:
+        # rows: row by row, tb: the pixel order of dwt_module_tb.sv
+        if order == "tb":
+            pixels = dwt_model.tb_stream(images)
+        else:
+            pixels = images.reshape(len(images), length*length)
+        expected = dwt_model.dwt_module(pixels, length, TRUNCATE)
+
+        for i in range(len(images)):
+            await tb.dwt.transform(pixels[i], out[k], expected[i])
+            k += 1
+    cycles = (get_sim_time() - start) / tb.clock.period
+
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    # reported outside of the deferred testbench log
+    dut._log.info("%s order: %d images of %dx%d in %d cycles, %.0f cycles/image",
+                  order, count, length, length, cycles, cycles / count)
+
+    await RisingEdge(dut.clk)
+
+
+if cocotb.SIM_NAME:
+    factory = TestFactory(run_test)
+    factory.add_option("order", ["rows", "tb"])
+    factory.generate_tests()
+
+# cocotb-test
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', 'rtl'))
+
+def test_dwt_module():
+    dut = "dwt_module"
+    toplevel = dut
+
+    # essentials first, it is the package all modules import
+    verilog_sources = [os.path.join(rtl_dir, f"{module}.sv") for module in ["essentials"] + MODULES]
+
+    tbutils.run(__file__, toplevel, verilog_sources, sim_build=dut)
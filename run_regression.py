@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""
+Parallel cocotb regression runner
+
+Collects the cocotb-test pytest functions of the testbench directories and runs them as separate
+simulator jobs on a local pool of workers, each job in its own sim_build directory: tbutils.run places
+every simulation of the job under it (SIM_BUILD_DIR), cached builds included. Job and test case wall
+times are kept in a history file, and the next run dispatches the longest jobs first. With --shard,
+jobs whose TestFactory variants are known from a previous run are split into several simulator runs,
+each running a subset of the variants.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import cocotb
+
+root_dir = os.path.abspath(os.path.dirname(__file__))
+
+TB_DIRS = [
+    os.path.join(root_dir, "AXI-Interconnect", "tb"),
+    os.path.join(root_dir, "Misc", "tb"),
+    os.path.join(root_dir, "Wavelet-Transformer", "tb")
+]
+
+COCOTB_2 = int(cocotb.__version__.split(".")[0]) >= 2
+
+
+class Job(object):
+    def __init__(self, tb_dir, node, testcases=None, expected=None, shard=None, module_hash=None):
+        self.tb_dir = tb_dir
+        self.node = node
+        self.module_hash = module_hash
+        self.testcases = testcases
+        self.expected = expected
+
+        # history key, node IDs are relative to their testbench directory
+        self.key = os.path.relpath(tb_dir, root_dir) + "/" + node
+        self.name = re.sub(r'[^\w\-]+', '_', self.key) + (f"_shard{shard}" if shard is not None else "")
+        self.duration = None
+        self.passed = None
+        self.results = {}
+
+    def env(self, build_dir):
+        env = dict(os.environ)
+        env["SIM_BUILD_DIR"] = build_dir
+        env["COCOTB_RESULTS_FILE"] = os.path.join(build_dir, "results.xml")
+
+        if self.testcases:
+            if COCOTB_2:
+                env["COCOTB_TEST_FILTER"] = "^(" + "|".join(re.escape(t) for t in self.testcases) + ")$"
+            else:
+                env["TESTCASE"] = ",".join(self.testcases)
+
+        return env
+
+
+def collect(tb_dir):
+    out = subprocess.run([sys.executable, "-m", "pytest", "--collect-only", "-q"], cwd=tb_dir, capture_output=True, text=True).stdout
+
+    # node IDs only, pytest warnings in the summary may quote them too
+    return [line for line in out.splitlines() if re.match(r"[^\s:]+\.py::", line)]
+
+
+def module_hash(tb_dir, node):
+    # the TestFactory variants of a node are only known for the test module they were recorded with
+    h = hashlib.sha256()
+    with open(os.path.join(tb_dir, node.split("::")[0]), 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def load_history(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def shard(testcases, count):
+    # longest processing time first: next longest test case goes to the least loaded shard
+    shards = [[0.0, []] for k in range(min(count, len(testcases)))]
+
+    for name, duration in sorted(testcases.items(), key=lambda t: -t[1]):
+        s = min(shards, key=lambda s: s[0])
+        s[0] += duration
+        s[1].append(name)
+
+    return shards
+
+
+def plan(history, workers, sharding):
+    jobs = []
+
+    for tb_dir in TB_DIRS:
+        for node in collect(tb_dir):
+            known = history.get(os.path.relpath(tb_dir, root_dir) + "/" + node, {})
+            testcases = known.get("testcases", {})
+            current = module_hash(tb_dir, node)
+
+            # a changed module may have added, renamed or removed variants: one job runs them all, as on a first run
+            if sharding and len(testcases) > 1 and workers > 1 and known.get("module_hash") == current:
+                for k, (expected, names) in enumerate(shard(testcases, workers)):
+                    jobs.append(Job(tb_dir, node, names, expected, k, current))
+            else:
+                jobs.append(Job(tb_dir, node, None, known.get("duration"), module_hash=current))
+
+    # jobs never seen before run first, as their duration is unknown
+    jobs.sort(key=lambda j: -(j.expected if j.expected is not None else float('inf')))
+
+    return jobs
+
+
+def run_job(job, build_root):
+    build_dir = os.path.join(build_root, job.name)
+    os.makedirs(build_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    with open(os.path.join(build_dir, "regression.log"), 'w') as log:
+        rc = subprocess.run([sys.executable, "-m", "pytest", "-q", job.node], cwd=job.tb_dir,
+                            env=job.env(build_dir), stdout=log, stderr=subprocess.STDOUT).returncode
+    job.duration = time.perf_counter() - start
+    job.passed = rc == 0
+
+    try:
+        for tc in ET.parse(os.path.join(build_dir, "results.xml")).iter("testcase"):
+            job.results[tc.get("name")] = float(tc.get("time", 0))
+    except (IOError, ET.ParseError):
+        pass
+
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="number of parallel simulator jobs")
+    parser.add_argument('--shard', action='store_true', help="split jobs into TestFactory variant shards")
+    parser.add_argument('--history', type=str, default=os.path.join(root_dir, "regression_history.json"), help="job duration history file")
+    parser.add_argument('--build_dir', type=str, default=os.path.join(root_dir, "regression_build"), help="root of the per-job sim_build directories")
+    parser.add_argument('-n', '--dry_run', action='store_true', help="print the schedule without running it")
+
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    jobs = plan(history, args.jobs, args.shard)
+
+    print(f"{len(jobs)} jobs on {args.jobs} workers")
+    for job in jobs:
+        expected = f"{job.expected:8.1f} s" if job.expected is not None else "  unknown"
+        print(f"  {expected}  {job.key}" + (f" [{len(job.testcases)} test cases]" if job.testcases else ""))
+
+    if args.dry_run or not jobs:
+        return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for job in pool.map(lambda j: run_job(j, args.build_dir), jobs):
+            print(f"{'PASS' if job.passed else 'FAIL'} {job.duration:8.1f} s  {job.key}" + (f" ({job.name})" if job.testcases else ""))
+    total = time.perf_counter() - start
+
+    # shards of the same node are merged back for the next schedule
+    for key in set(j.key for j in jobs):
+        node_jobs = [j for j in jobs if j.key == key]
+        # an unsharded job ran every variant, names it did not report are gone
+        if any(j.testcases is None for j in node_jobs):
+            testcases = {}
+        else:
+            testcases = history.get(key, {}).get("testcases", {})
+        for j in node_jobs:
+            testcases.update(j.results)
+        history[key] = dict(
+            duration=sum(j.duration for j in node_jobs),
+            testcases=testcases,
+            module_hash=node_jobs[0].module_hash
+        )
+
+    with open(args.history, 'w') as f:
+        json.dump(history, f, indent=4, sort_keys=True)
+
+    failed = [j for j in jobs if not j.passed]
+    print(f"Done in {total:.1f} s, sum of job times {sum(j.duration for j in jobs):.1f} s, "
+          f"longest job {max(j.duration for j in jobs):.1f} s, {len(failed)} failed")
+
+    if failed:
+        print("Logs of failed jobs:")
+        for j in failed:
+            print(f"  {os.path.join(args.build_dir, j.name, 'regression.log')}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Shared cocotb testbench utilities
+"""
+
+import os
+
+from .deferred_log import Lazy, capture
+from .clocking import start_clock, wait_cycles, wait_until, reset
+from .runner import run, sim_build_dir
+from . import gpi_stats
+
+if os.environ.get("TB_GPI_STATS"):
+    gpi_stats.install(os.path.abspath(os.environ["TB_GPI_STATS"]))
@@ -0,0 +1,71 @@
+"""
+Clock and reset fixtures, and waits that cost few simulator callbacks
+"""
+
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Edge, Timer, ClockCycles
+
+import cocotb
+
+# period in sim steps of the clocks started with start_clock, by signal path
+_periods = {}
+
+
+def start_clock(signal, period, units="ns"):
+    """Starts a free running clock on signal, wait_cycles() on it then uses timers for long waits."""
+    clock = Clock(signal, period, units=units)
+    cocotb.start_soon(clock.start())
+    _periods[signal._path] = clock.period
+    return clock
+
+
+async def wait_cycles(clock, cycles):
+    """
+    Returns on the cycles-th rising edge of clock, like ClockCycles. For a clock started with
+    start_clock() the wait is one edge to align, a timer to the middle of the last cycle and the
+    final edge, instead of one callback per cycle.
+    """
+    period = _periods.get(clock._path)
+    if period is None or cycles <= 3:
+        if cycles > 0:
+            await ClockCycles(clock, cycles)
+        return
+
+    await RisingEdge(clock)
+    await Timer((cycles - 1) * period - period // 2, 'step')
+    await RisingEdge(clock)
+
+
+def _matches(signal, value):
+    v = signal.value
+    if callable(value):
+        return value(v)
+    return v.is_resolvable and int(v) == value
+
+
+async def wait_until(signal, value=1, clock=None):
+    """
+    Returns once signal equals value (or value(signal.value) is true for a callable), resuming on
+    changes of signal instead of checking it every cycle. With clock, returns on the first rising edge
+    of clock at which signal has the value, as a synchronous design would sample it.
+    """
+    edge = Edge(signal)
+    while True:
+        if _matches(signal, value):
+            if clock is None:
+                return
+            await RisingEdge(clock)
+            if _matches(signal, value):
+                return
+        else:
+            await edge
+
+
+async def reset(clock, signal, active_level=True, pre=2, hold=2, post=0):
+    """Reset sequence on clock edges: inactive for pre cycles, active for hold cycles, then post cycles."""
+    signal.setimmediatevalue(int(not active_level))
+    await wait_cycles(clock, pre)
+    signal.value = int(active_level)
+    await wait_cycles(clock, hold)
+    signal.value = int(not active_level)
+    await wait_cycles(clock, post)
@@ -0,0 +1,153 @@
+"""
+Deferred testbench logging
+
+Records of the captured loggers go into a bounded ring buffer instead of the console. They are
+formatted and written out only when a test fails, so a passing test pays for creating the records
+and nothing else. Records at or above the live level are written out immediately as usual.
+
+Verbosity is set per test through the environment. Every variable takes a level, or comma separated
+<pattern>=<level> entries matched against the test name (fnmatch, first match wins) and an
+optional bare level for the other tests:
+
+    TB_LOG=DEBUG                            record level, DEBUG by default
+    TB_LOG="run_stress_test*=INFO,DEBUG"    only record INFO and above in the stress tests
+    TB_LOG_LIVE=WARNING                     live level, WARNING by default; DEBUG logs everything eagerly
+    TB_LOG_DEPTH=10000                      ring buffer size in records
+"""
+
+import os
+import logging
+from fnmatch import fnmatchcase
+from collections import deque
+
+from cocotb.utils import get_sim_time, get_time_from_sim_steps
+
+from .regression import current_test, watch
+
+DEFAULT_DEPTH = 10000
+
+_handler = None
+
+
+class Lazy(object):
+    """
+    Log argument rendered only when the record is formatted, log.debug("%s", Lazy(hexlify, data)).
+    The arguments are kept by reference until then, pass copies of buffers that change later.
+    """
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+def parse_level(value):
+    level = logging.getLevelName(value.strip().upper())
+    return level if isinstance(level, int) else int(value)
+
+
+def level_for(spec, test, default):
+    """Level for test from a "<level>" or "<pattern>=<level>,...,<level>" spec."""
+    if not spec:
+        return default
+    fallback = default
+    for entry in spec.split(","):
+        pattern, sep, value = entry.strip().rpartition("=")
+        if not value:
+            continue
+        if not sep:
+            fallback = parse_level(value)
+        elif test and fnmatchcase(test, pattern):
+            return parse_level(value)
+    return fallback
+
+
+def _forward(record):
+    # to the handlers above the captured logger, as if it had propagated
+    logging.getLogger(record.name).parent.handle(record)
+
+
+class RingHandler(logging.Handler):
+    """Keeps records below the live level in a ring buffer, forwards the others."""
+    def __init__(self, depth=DEFAULT_DEPTH):
+        super().__init__()
+        self.ring = deque(maxlen=depth)
+        self.loggers = []
+        self.test = None
+        self.level_record = logging.DEBUG
+        self.level_live = logging.WARNING
+        self.count = 0
+
+    def handle(self, record):
+        # no filters and no lock, simulations are single threaded
+        if record.levelno >= self.level_live:
+            _forward(record)
+        else:
+            record.tb_sim_time = get_sim_time()
+            self.ring.append(record)
+            self.count += 1
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+    def start(self, test):
+        """Drop the records of the previous test and apply the levels of test."""
+        self.test = test
+        self.ring.clear()
+        self.count = 0
+        self.level_record = level_for(os.environ.get("TB_LOG"), test, logging.DEBUG)
+        self.level_live = level_for(os.environ.get("TB_LOG_LIVE"), test, logging.WARNING)
+        for logger in self.loggers:
+            logger.setLevel(min(self.level_record, self.level_live))
+
+    def capture(self, logger):
+        if logger not in self.loggers:
+            self.loggers.append(logger)
+            logger.addHandler(self)
+            logger.propagate = False
+        logger.setLevel(min(self.level_record, self.level_live))
+
+    def end(self, test, passed):
+        if not passed:
+            self.dump()
+
+    def dump(self):
+        # not flush(), logging.shutdown() calls that on every handler at exit
+        records = list(self.ring)
+        self.ring.clear()
+        if not records:
+            return
+
+        log = logging.getLogger("cocotb.deferred")
+        log.warning("%d deferred log records of %s (%d dropped):", len(records), self.test, self.count - len(records))
+        for record in records:
+            # the console shows the time of the dump, keep the time of the record in the message
+            t = get_time_from_sim_steps(record.tb_sim_time, "ns")
+            record.msg = f"[{t:.2f}ns] {record.getMessage()}"
+            record.args = None
+            _forward(record)
+        log.warning("end of deferred log records of %s", self.test)
+        self.count = 0
+
+
+def capture(*loggers):
+    """
+    Send the records of loggers (Logger objects or names) to the ring buffer of the running test,
+    call it from the testbench constructor. Returns the ring buffer handler.
+    """
+    global _handler
+    if _handler is None:
+        _handler = RingHandler(int(os.environ.get("TB_LOG_DEPTH", DEFAULT_DEPTH)))
+        _handler.start(current_test())
+        watch(start=_handler.start, end=_handler.end)
+
+    for logger in loggers:
+        if isinstance(logger, str):
+            logger = logging.getLogger(logger)
+        _handler.capture(logger)
+
+    return _handler
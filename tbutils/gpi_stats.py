@@ -0,0 +1,63 @@
+"""
+Per test counts of the simulator (GPI) callbacks registered by cocotb triggers
+
+Enabled with TB_GPI_STATS=<file>: every test appends a line {"test", "counts", "total"} to the file and
+logs the total. Timers include the ones of cocotb Clock, value change callbacks the edge triggers.
+"""
+
+import json
+import logging
+
+import cocotb
+
+from .regression import watch
+
+CALLBACKS = (
+    "register_timed_callback",
+    "register_value_change_callback",
+    "register_readonly_callback",
+    "register_nextstep_callback",
+    "register_rwsynch_callback"
+)
+
+_counter = None
+
+
+class CallbackCounter(object):
+    def __init__(self, path):
+        self.path = path
+        self.counts = dict.fromkeys(CALLBACKS, 0)
+        self.log = logging.getLogger("cocotb.gpi_stats")
+
+        from cocotb import simulator
+        for name in CALLBACKS:
+            setattr(simulator, name, self._wrap(name, getattr(simulator, name)))
+
+        watch(start=self.start, end=self.end)
+
+    def _wrap(self, name, register):
+        counts = self.counts
+
+        def counted(*args):
+            counts[name] += 1
+            return register(*args)
+        return counted
+
+    def start(self, test):
+        for name in CALLBACKS:
+            self.counts[name] = 0
+
+    def end(self, test, passed):
+        total = sum(self.counts.values())
+        self.log.info("%s: %d simulator callbacks (%s)", test, total,
+                      ", ".join(f"{name[9:-9]} {n}" for name, n in self.counts.items() if n))
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(dict(test=test, counts=self.counts, total=total)) + "\n")
+
+
+def install(path):
+    """Starts counting, once per simulation. No-op outside of a simulator."""
+    global _counter
+    if _counter is None and cocotb.SIM_NAME:
+        _counter = CallbackCounter(path)
+    return _counter
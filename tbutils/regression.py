@@ -0,0 +1,99 @@
+"""
+Test start and result notifications from the cocotb regression manager
+"""
+
+import re
+import logging
+
+import cocotb
+from cocotb.regression import RegressionManager
+
+_ansi = re.compile(r"\x1b\[[0-9;]*m")
+_result = re.compile(r"(\S+) (passed|failed)\b")
+
+_watchers = []
+_hooked = None
+
+
+def current_test():
+    test = getattr(getattr(cocotb, "regression_manager", None), "_test", None)
+    return getattr(test, "__qualname__", None)
+
+
+def _hook():
+    """
+    Wraps the RegressionManager methods that start a test and score its outcome, returns False when
+    this cocotb has none of them.
+    """
+    start_test = getattr(RegressionManager, "_start_test", None)
+    score_test = getattr(RegressionManager, "_score_test", None)
+    if start_test is None or score_test is None:
+        return False
+
+    def _start_test(self):
+        for watcher in list(_watchers):
+            watcher.notify_start(self._test.__qualname__)
+        return start_test(self)
+
+    def _score_test(self, test, outcome):
+        passed, sim_failed = score_test(self, test, outcome)
+        for watcher in list(_watchers):
+            watcher.notify_end(test.__qualname__, passed)
+        return passed, sim_failed
+
+    RegressionManager._start_test = _start_test
+    RegressionManager._score_test = _score_test
+    return True
+
+
+class RegressionWatcher(logging.Handler):
+    """
+    start(test) is called when a test starts, end(test, passed) when its result is scored.
+
+    Notified by the RegressionManager methods _hook() wraps. Where they do not exist, the handler follows
+    the "running" and "passed"/"failed" messages of the regression manager instead, and complains when
+    a result comes for a test it did not see start.
+    """
+    def __init__(self, start=None, end=None):
+        super().__init__()
+        self.start = start
+        self.end = end
+        self.test = current_test()
+
+    def notify_start(self, test):
+        self.test = test
+        if self.start:
+            self.start(test)
+
+    def notify_end(self, test, passed):
+        if self.end:
+            self.end(test, passed)
+
+    def emit(self, record):
+        msg = _ansi.sub("", record.getMessage())
+        if msg.startswith("running "):
+            self.notify_start(msg.split()[1])
+        else:
+            m = _result.match(msg)
+            if m:
+                if m.group(1) != self.test:
+                    logging.getLogger("cocotb.tbutils").error(
+                        "result of %s without its \"running\" message, the start of the test was missed", m.group(1))
+                self.notify_end(m.group(1), m.group(2) == "passed")
+
+
+def watch(start=None, end=None):
+    global _hooked
+    if _hooked is None:
+        _hooked = _hook()
+
+    watcher = RegressionWatcher(start, end)
+    if _hooked:
+        _watchers.append(watcher)
+    else:
+        # the messages are INFO records, COCOTB_LOG_LEVEL=WARNING would drop them before the handler
+        log = logging.getLogger("cocotb.regression")
+        if log.getEffectiveLevel() > logging.INFO:
+            log.setLevel(logging.INFO)
+        log.addHandler(watcher)
+    return watcher
@@ -0,0 +1,42 @@
+"""
+cocotb-test runner with the defaults of the repository
+"""
+
+import os
+
+import cocotb_test.simulator
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def sim_build_dir(tests_dir):
+    # run_regression.py gives every job its own sim_build directory
+    return os.environ.get("SIM_BUILD_DIR", os.path.join(tests_dir, "sim_build"))
+
+
+def run(test_file, toplevel, verilog_sources, sim_build=None, runner=None, **kwargs):
+    """
+    Runs the cocotb tests of the module test_file (pass __file__) on toplevel. The testbench directory
+    and the repository root are on the Python search path, the timescale is 1ns/1ps and sim_build
+    (toplevel by default) is placed under sim_build_dir(). runner replaces cocotb_test.simulator.run,
+    e.g. with BuildCache.run, which compiles into its cache and simulates in sim_build.
+    """
+    tests_dir = os.path.dirname(os.path.abspath(test_file))
+    module = os.path.splitext(os.path.basename(test_file))[0]
+
+    kwargs["python_search"] = [tests_dir, root_dir] + kwargs.get("python_search", [])
+    kwargs.setdefault("timescale", "1ns/1ps")
+    kwargs["sim_build"] = os.path.abspath(os.path.join(sim_build_dir(tests_dir), sim_build or toplevel))
+
+    # jobs of run_regression.py run in parallel, nothing may be simulated outside of the job's directory
+    if "SIM_BUILD_DIR" in os.environ:
+        job_dir = os.path.abspath(os.environ["SIM_BUILD_DIR"])
+        if os.path.commonpath([job_dir, kwargs["sim_build"]]) != job_dir:
+            raise ValueError(f"sim_build {kwargs['sim_build']} is outside of SIM_BUILD_DIR {job_dir}")
+
+    return (runner or cocotb_test.simulator.run)(
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        **kwargs
+    )